@@ -0,0 +1,491 @@
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import discord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Teste de carga do bot.py sem Discord: guilds, membros, canais e interações falsos
+# (em processo) com latência de REST simulada, dirigindo os mesmos handlers que o
+# gateway chamaria. Sai com código 1 se algo falhar ou passar dos limites (--max-*),
+# para rodar em CI.
+
+_ids = itertools.count(10**17)
+
+
+def snowflake() -> int:
+    return next(_ids)
+
+
+class FakeREST:
+    """Latência de cada chamada REST: `latency` ± 50%, contando as chamadas."""
+
+    def __init__(self, latency: float, rng: random.Random):
+        self.latency = latency
+        self.rng = rng
+        self.calls = 0
+
+    async def call(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+
+
+class FakeRole:
+    def __init__(self, name: str):
+        self.id = snowflake()
+        self.name = name
+        self.mention = f"<@&{self.id}>"
+
+
+class FakeMember(discord.Member):
+    # discord.Member expõe estes campos como propriedades sobre o usuário; aqui são atributos simples.
+    id = name = display_name = mention = roles = guild_permissions = None
+
+    def __init__(self, guild, name: str, rest: FakeREST, admin: bool = False):
+        self.guild = guild
+        self.id = snowflake()
+        self.name = self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.roles = [guild.default_role]
+        self.guild_permissions = discord.Permissions(administrator=admin)
+        self._rest = rest
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return isinstance(other, FakeMember) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def add_roles(self, *roles, reason=None):
+        await self._rest.call()
+        self.roles.extend(roles)
+
+
+class FakeMessage:
+    __slots__ = ("id", "author", "content", "created_at", "attachments", "embeds")
+
+    def __init__(self, author, content: str):
+        self.id = snowflake()
+        self.author = author
+        self.content = content
+        self.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.attachments = []
+        self.embeds = []
+
+
+class FakeCategory(discord.CategoryChannel):
+    type = discord.ChannelType.category
+
+    def __init__(self, guild, name: str):
+        self.guild = guild
+        self.id = snowflake()
+        self.name = name
+        self.category_id = None
+        self._rest = guild._rest
+
+    async def delete(self, reason=None):
+        await self._rest.call()
+        self.guild._remove_channel(self)
+
+
+class FakeTextChannel(discord.TextChannel):
+    type = discord.ChannelType.text
+    mention = None
+
+    def __init__(self, guild, name: str, category, rest: FakeREST):
+        self.guild = guild
+        self.id = snowflake()
+        self.name = name
+        self.category_id = category.id if category else None
+        self.mention = f"<#{self.id}>"
+        self.messages: list[FakeMessage] = []
+        self.sent = 0
+        self.deleted = asyncio.Event()
+        self._rest = rest
+
+    async def send(self, content=None, *, embed=None, embeds=None, files=None, view=None, **_):
+        await self._rest.call()
+        self.sent += 1
+        self.messages.append(FakeMessage(self.guild.me, content or ""))
+
+    async def history(self, limit=None, oldest_first=False):
+        messages = self.messages if oldest_first else self.messages[::-1]
+        for i, msg in enumerate(messages[:limit]):
+            if i % 100 == 0:  # uma requisição por página de 100
+                await self._rest.call()
+            yield msg
+
+    async def delete(self, reason=None):
+        await self._rest.call()
+        self.guild._remove_channel(self)
+        self.deleted.set()
+        await bot.on_guild_channel_delete(self)
+
+
+class FakeGuild:
+    def __init__(self, index, rest: FakeREST):
+        self.index = index
+        self.id = snowflake()
+        self.shard_id = 0
+        self.filesize_limit = 25 * 1024 * 1024
+        self.default_role = FakeRole("@everyone")
+        self.roles = [self.default_role]
+        self.categories: list[FakeCategory] = []
+        self.text_channels: list[FakeTextChannel] = []
+        self._channels: dict[int, object] = {}
+        self._members: dict[int, FakeMember] = {}
+        self._rest = rest
+        self.me = self.add_member("KiraBot", admin=True)
+
+    def add_member(self, name: str, admin: bool = False) -> FakeMember:
+        member = FakeMember(self, name, self._rest, admin)
+        self._members[member.id] = member
+        return member
+
+    def get_member(self, user_id: int):
+        return self._members.get(user_id)
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    def get_channel(self, channel_id: int):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id: int):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    def _add_channel(self, channel):
+        self._channels[channel.id] = channel
+        (self.categories if isinstance(channel, FakeCategory) else self.text_channels).append(channel)
+        bot.channel_index.add(channel)  # on_guild_channel_create
+
+    def _remove_channel(self, channel):
+        self._channels.pop(channel.id, None)
+        (self.categories if isinstance(channel, FakeCategory) else self.text_channels).remove(channel)
+        bot.channel_index.remove(channel)  # on_guild_channel_delete
+
+    async def create_category(self, name: str, reason=None):
+        await self._rest.call()
+        category = FakeCategory(self, name)
+        self._add_channel(category)
+        return category
+
+    async def create_text_channel(self, name: str, category=None, overwrites=None, reason=None):
+        await self._rest.call()
+        if category and sum(c.category_id == category.id for c in self.text_channels) >= bot.CATEGORY_CHANNEL_LIMIT:
+            error = {"parent_id": {"_errors": [{"code": "CHANNEL_PARENT_MAX_CHANNELS", "message": "Maximum number of channels in category reached (50)"}]}}
+            raise discord.HTTPException(SimpleNamespace(status=400, reason="Bad Request"), {"code": 50035, "message": "Invalid Form Body", "errors": error})
+        channel = FakeTextChannel(self, name, category, self._rest)
+        self._add_channel(channel)
+        return channel
+
+    async def create_role(self, name: str, reason=None):
+        await self._rest.call()
+        role = FakeRole(name)
+        self.roles.append(role)
+        return role
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send_message(self, content=None, *, ephemeral=False, **_):
+        await self._interaction.rest.call()
+        self._interaction.acked(content)
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        await self._interaction.rest.call()
+        self._interaction.acked(None)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, *, ephemeral=False, **_):
+        await self._interaction.rest.call()
+        self._interaction.finished(content)
+
+
+class FakeInteraction:
+    """Interação de componente: `ack` é a primeira resposta (o Discord exige em 3s), `done` a última."""
+
+    def __init__(self, guild, user, channel, rest: FakeREST):
+        self.guild = guild
+        self.user = user
+        self.channel = channel
+        self.rest = rest
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.started = 0.0
+        self.ack_at = None
+        self.reply = None
+        self.done = asyncio.Event()
+
+    def acked(self, content):
+        self.ack_at = time.perf_counter()
+        if content is not None:
+            self.finished(content)
+
+    def finished(self, content):
+        self.reply = content
+        self.done.set()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def histogram_quantile(histogram, q: float) -> float:
+    # Limite superior do bucket que contém o quantil, somando todas as séries rotuladas.
+    counts = [0] * len(histogram.buckets)
+    total = 0
+    for child in list(histogram._children.values()):
+        for i, n in enumerate(child.counts):
+            counts[i] += n
+        total += child.count
+    if not total:
+        return 0.0
+    rank, seen = q * total, 0
+    for bound, n in zip(histogram.buckets, counts):
+        seen += n
+        if seen >= rank:
+            return bound
+    return float("inf")
+
+
+def histogram_totals(histogram) -> tuple[int, float]:
+    children = list(histogram._children.values())
+    return sum(c.count for c in children), sum(c.sum for c in children)
+
+
+async def watch_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def drive(name: str, interactions, handler, concurrency: int, results: dict, wait_done, lags: list):
+    acks, dones, failures = [], [], []
+    first_lag = len(lags)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(interaction):
+        async with sem:
+            interaction.started = time.perf_counter()
+            try:
+                await handler(interaction)
+                await asyncio.wait_for(wait_done(interaction), 60)
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+                return
+            if interaction.ack_at is None:
+                failures.append("sem resposta à interação")
+                return
+            acks.append(interaction.ack_at - interaction.started)
+            dones.append(time.perf_counter() - interaction.started)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in interactions))
+    results[name] = {
+        "elapsed": time.perf_counter() - t0,
+        "acks": acks,
+        "dones": dones,
+        "failures": failures,
+        # Só o atraso durante a fase: a primeira amostra ainda cobre a preparação feita pelo próprio bench.
+        "lags": lags[first_lag + 1 :],
+    }
+
+
+async def run(args):
+    rng = random.Random(7)
+    rest = FakeREST(args.rest_latency / 1000, rng)
+    lags: list[float] = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop_lag(stop, lags))
+    bot.job_queue.start()
+
+    guilds = []
+    for g in range(args.guilds):
+        guild = FakeGuild(g, rest)
+        staff = FakeRole("Staff")
+        guild.roles.append(staff)
+        log_ch = FakeTextChannel(guild, "logs", None, rest)
+        guild._add_channel(log_ch)
+        await bot.upsert_guild_config(guild.id, log_channel_id=log_ch.id, staff_role_id=staff.id)
+        guilds.append(guild)
+
+    categories = list((await bot.get_ticket_categories(guilds[0].id)).values())
+    select = bot.TicketCategorySelect([c for c in categories if not c["button"]])
+    buttons = {c["key"]: bot.TicketOpenButton(c["key"]) for c in categories if c["button"]}
+    keys = [c["key"] for c in categories]
+    close_view = bot.CloseTicketView()
+    verify_view = bot.VerifyView()
+
+    async def open_handler(interaction):
+        key = interaction.category_key
+        if key in buttons:
+            await buttons[key].callback(interaction)
+        else:
+            select._values = [key]
+            await select.callback(interaction)
+
+    async def wait_reply(interaction):
+        await interaction.done.wait()
+
+    async def wait_deleted(interaction):
+        await interaction.channel.deleted.wait()
+
+    # Abertura: cada membro abre um ticket numa categoria sorteada (botão ou menu).
+    opens = []
+    for i in range(args.tickets):
+        guild = guilds[i % len(guilds)]
+        member = guild.add_member(f"membro {i}")
+        interaction = FakeInteraction(guild, member, None, rest)
+        interaction.category_key = rng.choice(keys)
+        opens.append(interaction)
+
+    tracemalloc.start()
+    results: dict[str, dict] = {}
+    rest_calls = rest.calls
+    await drive("open", opens, open_handler, args.concurrency, results, wait_reply, lags)
+    for guild in guilds:
+        guild.opened_categories = len(guild.categories)
+
+    # Conversa nos tickets e fechamento pelo dono (transcrição + arquivo + histórico).
+    closes = []
+    for guild in guilds:
+        by_mention = {m.mention: m for m in guild._members.values()}
+        for channel in [c for c in guild.text_channels if c.name != "logs"]:
+            owner = by_mention[channel.messages[0].content]
+            for n in range(args.messages):
+                channel.messages.append(FakeMessage(owner if n % 2 else guild.me, f"mensagem {n} " + "x" * rng.randint(10, 200)))
+            closes.append(FakeInteraction(guild, owner, channel, rest))
+    await drive("close", closes, close_view.close.callback, args.concurrency, results, wait_deleted, lags)
+
+    verifies = []
+    for i in range(args.tickets):
+        guild = guilds[i % len(guilds)]
+        verifies.append(FakeInteraction(guild, guild.add_member(f"visitante {i}"), None, rest))
+    await drive("verify", verifies, verify_view.verify.callback, args.concurrency, results, wait_reply, lags)
+
+    await bot.log_sink.flush(10)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rest_calls = rest.calls - rest_calls
+    stop.set()
+    await watcher
+    await bot.job_queue.stop()
+    return results, rest_calls, peak, guilds
+
+
+def report(args, results, rest_calls, peak, guilds) -> list[str]:
+    ms = 1000
+    problems = []
+    print(
+        f"tickets={args.tickets} guilds={args.guilds} concurrency={args.concurrency} workers={args.workers} "
+        f"rest_latency={args.rest_latency}ms messages/ticket={args.messages}"
+    )
+    for name, r in results.items():
+        ok = len(r["dones"])
+        print(
+            f"{name:6} {ok / r['elapsed']:7.0f}/s  ack p50={percentile(r['acks'], 50) * ms:6.1f}ms "
+            f"p99={percentile(r['acks'], 99) * ms:6.1f}ms  concluído p50={percentile(r['dones'], 50) * ms:6.1f}ms "
+            f"p99={percentile(r['dones'], 99) * ms:6.1f}ms  falhas={len(r['failures'])}"
+        )
+        for failure in sorted(set(r["failures"]))[:5]:
+            print(f"       {failure}")
+        if r["failures"]:
+            problems.append(f"{name}: {len(r['failures'])} falhas")
+        if args.max_ack_p99_ms and percentile(r["acks"], 99) * ms > args.max_ack_p99_ms:
+            problems.append(f"{name}: ack p99 acima de {args.max_ack_p99_ms}ms")
+        if args.max_done_p99_ms and percentile(r["dones"], 99) * ms > args.max_done_p99_ms:
+            problems.append(f"{name}: conclusão p99 acima de {args.max_done_p99_ms}ms")
+
+    commits, commit_total = histogram_totals(metrics.STORAGE_COMMIT_SECONDS)
+    batches, ops = histogram_totals(metrics.STORAGE_BATCH_SIZE)
+    queries, _ = histogram_totals(metrics.STORAGE_QUERY_SECONDS)
+    stats = bot.job_queue.stats()
+    print(
+        f"sqlite {queries} consultas, {commits} commits ({ops / max(batches, 1):.1f} ops/commit), "
+        f"commit p99≤{histogram_quantile(metrics.STORAGE_COMMIT_SECONDS, 0.99) * ms:.0f}ms, "
+        f"consulta p99≤{histogram_quantile(metrics.STORAGE_QUERY_SECONDS, 0.99) * ms:.1f}ms, "
+        f"escrita ocupada {commit_total / max(sum(r['elapsed'] for r in results.values()), 1e-9):.0%} do tempo"
+    )
+    for name, job in stats["jobs"].items():
+        print(f"job {name:6} espera p99={job['wait']['p99'] * ms:.1f}ms  execução p99={job['run']['p99'] * ms:.1f}ms")
+    if stats["failed"]:
+        problems.append(f"{stats['failed']} jobs falharam")
+
+    log_messages = sum(c.sent for g in guilds for c in g.text_channels if c.name == "logs")
+    print(f"REST simulado: {rest_calls} chamadas; canal de logs: {log_messages} mensagens")
+    # Com mais de 50 tickets por categoria surgem "<nome> 2", ...; vazias, devem sumir no fechamento.
+    opened = sum(g.opened_categories for g in guilds)
+    left = sum(len(g.categories) for g in guilds)
+    print(f"categorias: {opened} com os tickets abertos, {left} depois do fechamento")
+    if left > len(guilds) * len(bot.DEFAULT_TICKET_CATEGORIES):
+        problems.append(f"{left} categorias restantes: shards vazios não foram apagados")
+    lags = [lag for r in results.values() for lag in r["lags"]]
+    print(
+        f"event loop lag p99={percentile(lags, 99) * ms:.2f}ms max={max(lags, default=0) * ms:.2f}ms  "
+        f"memória: pico Python {peak / 2**20:.1f}MiB, RSS máx {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MiB"
+    )
+    return problems
+
+
+def main(args):
+    global bot, metrics
+    with tempfile.TemporaryDirectory() as tmp:
+        # bot.py abre tickets.db no diretório atual e lê a configuração do ambiente na importação.
+        os.chdir(tmp)
+        os.environ["TICKET_WORKERS"] = str(args.workers)
+        os.environ["TICKET_QUEUE_SIZE"] = str(max(args.tickets * 2, 500))
+        os.environ["TRANSCRIPT_MAX_MESSAGES"] = "0"
+        import bot
+        import metrics
+
+        try:
+            outcome = asyncio.run(run(args))
+        finally:
+            bot.storage.close()
+            os.chdir(ROOT)
+    problems = report(args, *outcome)
+    for problem in problems:
+        print(f"FALHOU: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga offline do bot: abrir, fechar e verificar com Discord falso.")
+    parser.add_argument("--tickets", type=int, default=1000)
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8, help="TICKET_WORKERS do bot")
+    parser.add_argument("--rest-latency", type=float, default=40, help="latência média de cada chamada REST, em ms")
+    parser.add_argument("--messages", type=int, default=50, help="mensagens por ticket antes do fechamento")
+    parser.add_argument("--max-ack-p99-ms", type=float, help="falha se a primeira resposta p99 passar deste valor")
+    parser.add_argument("--max-done-p99-ms", type=float, help="falha se a conclusão p99 passar deste valor")
+    sys.exit(main(parser.parse_args()))
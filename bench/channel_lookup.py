@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_index import ChannelIndex  # noqa: E402
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, categories: int, channels: int, rng: random.Random):
+        self.id = guild_id
+        self._channels = {}
+        self.categories = []
+        self.text_channels = []
+        for i in range(categories):
+            cat = SimpleNamespace(id=10_000 + i, name=f"📁 Categoria {i}", type=discord.ChannelType.category, guild=self, category_id=None)
+            self.categories.append(cat)
+            self._channels[cat.id] = cat
+        for i in range(channels):
+            parent = rng.choice(self.categories)
+            ch = SimpleNamespace(id=100_000 + i, name=f"canal-{i}", type=discord.ChannelType.text, guild=self, category_id=parent.id)
+            self.text_channels.append(ch)
+            self._channels[ch.id] = ch
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    def get_channel(self, channel_id: int):
+        return self._channels.get(channel_id)
+
+
+def linear_category(guild, name):
+    # Busca antiga de get_or_create_category.
+    for c in guild.categories:
+        if c.name.lower() == name.lower():
+            return c
+    return None
+
+
+def linear_text_channel(guild, name, category_id):
+    # Busca antiga de get_or_create_text_channel.
+    for ch in guild.text_channels:
+        if ch.name.lower() == name.lower():
+            if category_id is None or ch.category_id == category_id:
+                return ch
+    return None
+
+
+def timeit(fn, queries) -> float:
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(*q)
+    return (time.perf_counter() - t0) / len(queries) * 1e6
+
+
+def main(args):
+    rng = random.Random(3)
+    guild = FakeGuild(1, args.categories, args.channels - args.categories, rng)
+    index = ChannelIndex()
+
+    t0 = time.perf_counter()
+    index.find_category(guild, "inexistente")
+    print(f"servidor sintético: {args.categories} categorias + {args.channels - args.categories} canais de texto")
+    print(f"indexação inicial: {(time.perf_counter() - t0) * 1e6:.0f}µs (uma vez por servidor)")
+
+    cat_queries = [(guild, rng.choice(guild.categories).name.upper()) for _ in range(args.lookups)]
+    cat_queries += [(guild, "📩 tickets - suporte")] * (args.lookups // 4)  # nomes ausentes: pior caso da busca linear
+    chan_queries = []
+    for _ in range(args.lookups):
+        ch = rng.choice(guild.text_channels)
+        chan_queries.append((guild, ch.name, ch.category_id))
+    chan_queries += [(guild, "painel-ticket", None)] * (args.lookups // 4)
+
+    for label, linear, indexed, queries in (
+        ("categoria", linear_category, index.find_category, cat_queries),
+        ("canal de texto", linear_text_channel, index.find_text_channel, chan_queries),
+    ):
+        for q in queries[:50]:
+            assert linear(*q) is indexed(*q)
+        before = timeit(linear, queries)
+        after = timeit(indexed, queries)
+        print(f"{label:15} linear {before:7.2f}µs  índice {after:5.2f}µs  ({before / after:.0f}x)")
+
+    # Manutenção pelos eventos: renomear um canal custa duas operações de dicionário.
+    ch = guild.text_channels[0]
+    renamed = SimpleNamespace(**{**vars(ch), "name": "renomeado"})
+    t0 = time.perf_counter()
+    for _ in range(args.lookups):
+        index.remove(ch)
+        index.add(renamed)
+        index.remove(renamed)
+        index.add(ch)
+    print(f"evento de update (remove + add): {(time.perf_counter() - t0) / (args.lookups * 2) * 1e6:.2f}µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca de categoria/canal por nome: varredura linear contra ChannelIndex.")
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    main(parser.parse_args())
@@ -0,0 +1,92 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate  # noqa: E402
+from storage import _get_ticket_by_channel, connect  # noqa: E402
+
+
+def fill(conn, rows: int, guilds: int):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def generate():
+        for i in range(rows):
+            created = start + timedelta(seconds=i)
+            yield (i % guilds, i, f"cat{i % 5}", 10**12 + i, created.isoformat())
+
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO tickets (guild_id, user_id, category_key, channel_id, created_at) VALUES (?, ?, ?, ?, ?)", generate())
+    conn.execute("COMMIT")
+
+
+def close_path(conn, samples):
+    # As duas consultas que todo fechamento faz: busca pelo canal e remoção (desfeita com ROLLBACK).
+    lookup, delete = [], []
+    for guild_id, channel_id in samples:
+        t0 = time.perf_counter()
+        _get_ticket_by_channel(conn, guild_id, channel_id)
+        lookup.append(time.perf_counter() - t0)
+
+        conn.execute("BEGIN")
+        t0 = time.perf_counter()
+        conn.execute("DELETE FROM tickets WHERE guild_id=? AND channel_id=?", (guild_id, channel_id))
+        delete.append(time.perf_counter() - t0)
+        conn.execute("ROLLBACK")
+    return lookup, delete
+
+
+def report(label: str, samples):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] * 1e6
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e6
+    print(f"{label:28} p50={p50:9.1f}µs p99={p99:9.1f}µs")
+
+
+def main(args):
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.db"))
+        conn.isolation_level = None
+        migrate(conn, target=1)
+
+        t0 = time.perf_counter()
+        fill(conn, args.rows, args.guilds)
+        print(f"{args.rows} tickets em {args.guilds} servidores carregados em {time.perf_counter() - t0:.1f}s")
+
+        picks = [rng.randrange(args.rows) for _ in range(args.lookups)]
+        samples = [(i % args.guilds, 10**12 + i) for i in picks]
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT user_id FROM tickets WHERE guild_id=? AND channel_id=?", samples[0]
+        ).fetchall()
+
+        print(f"versão 1: {plan[0][-1]}")
+        lookup, delete = close_path(conn, samples)
+        report("  get_ticket_by_channel", lookup)
+        report("  delete_ticket_by_channel", delete)
+
+        t0 = time.perf_counter()
+        migrate(conn)
+        print(f"migração até a versão atual: {time.perf_counter() - t0:.1f}s")
+
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT user_id FROM tickets WHERE guild_id=? AND channel_id=?", samples[0]
+        ).fetchall()
+        print(f"versão atual: {plan[0][-1]}")
+        lookup, delete = close_path(conn, samples)
+        report("  get_ticket_by_channel", lookup)
+        report("  delete_ticket_by_channel", delete)
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Custo das consultas do fechamento de ticket com e sem os índices da migração 2.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,156 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Teste de carga local da página /server/<id> do painel: banco sintético, Discord
+# falso e o servidor de produção de dashboard.py, comparando o pool de conexões
+# somente leitura com uma conexão nova por requisição.
+
+GUILD_ID = 123456789012345678
+
+
+class StubDiscord(ThreadingHTTPServer):
+    """Responde GET /users/@me/guilds com o servidor do teste, com latência fixa."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.calls = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.calls += 1
+        time.sleep(self.server.latency)
+        payload = json.dumps([{"id": str(GUILD_ID), "name": "Servidor de carga", "permissions": "8"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def fill(path: str, tickets: int, rng: random.Random):
+    # Metade dos tickets é fechada pelo caminho normal, alimentando histórico e agregados.
+    from storage import _delete_ticket_by_channel, _save_ticket, _upsert_guild_config, connect
+
+    conn = connect(path)
+    _upsert_guild_config(conn, GUILD_ID, 1, 2, 3)
+    for i in range(tickets):
+        _save_ticket(conn, GUILD_ID, 10**6 + i, rng.choice(("support", "financeiro", "formstaff")), 10**12 + i)
+        if i % 2:
+            _delete_ticket_by_channel(conn, GUILD_ID, 10**12 + i, 10**6 + rng.randrange(20), rng.randint(1, 200))
+    conn.commit()
+    conn.close()
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def load(url: str, cookie: str, requests_total: int, concurrency: int):
+    local = threading.local()
+    latencies, failures = [], []
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.cookies.set("session", cookie)
+        t0 = time.perf_counter()
+        try:
+            r = session.get(url, allow_redirects=False, timeout=30)
+        except requests.RequestException as e:
+            failures.append(type(e).__name__)
+            return
+        if r.status_code != 200:
+            failures.append(f"HTTP {r.status_code}")
+            return
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    return time.perf_counter() - t0, latencies, failures
+
+
+def main(args):
+    rng = random.Random(5)
+    # Com mais clientes que workers o waitress avisa a cada requisição enfileirada.
+    logging.getLogger("waitress.queue").setLevel(logging.ERROR)
+    stub = StubDiscord(args.discord_latency / 1000)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # dashboard.py abre tickets.db no diretório atual e lê a configuração do ambiente na importação.
+        os.chdir(tmp)
+        os.environ["FLASK_SECRET_KEY"] = "bench"
+        os.environ["SESSION_COOKIE_SECURE"] = "false"
+        os.environ["DISCORD_API_BASE_URL"] = f"http://127.0.0.1:{stub.server_port}"
+        os.environ["DASHBOARD_THREADS"] = str(args.threads)
+        import dashboard
+
+        t0 = time.perf_counter()
+        fill(dashboard.DB_FILE, args.tickets, rng)
+        print(f"{args.tickets} tickets carregados em {time.perf_counter() - t0:.1f}s")
+
+        server = dashboard.create_server("127.0.0.1", 0, args.threads)
+        port = getattr(server, "effective_port", None) or server.server_port
+        threading.Thread(target=server.run, daemon=True).start()
+        cookie = dashboard.app.session_interface.get_signing_serializer(dashboard.app).dumps(
+            {"user": {"id": "1", "username": "bench"}, "token": "bench-token"}
+        )
+        url = f"http://127.0.0.1:{port}/server/{GUILD_ID}"
+        print(
+            f"{type(server).__name__} com {args.threads} workers, {args.concurrency} clientes, "
+            f"{args.requests} requisições por modo, Discord falso com {args.discord_latency:.0f}ms"
+        )
+
+        failed = False
+        for label, size in (("conexão por requisição", 0), ("pool somente leitura", args.threads)):
+            dashboard.read_pool = dashboard.ReadPool(dashboard.DB_FILE, size)
+            load(url, cookie, args.concurrency, args.concurrency)  # aquecimento: caches do painel e do SQLite
+            elapsed, latencies, failures = load(url, cookie, args.requests, args.concurrency)
+            print(
+                f"{label:24} {len(latencies) / elapsed:7.0f} req/s  p50={percentile(latencies, 50) * 1000:6.1f}ms "
+                f"p99={percentile(latencies, 99) * 1000:6.1f}ms  falhas={len(failures)}"
+            )
+            for failure in sorted(set(failures))[:5]:
+                print(f"    {failure}")
+            failed = failed or bool(failures)
+        print(f"chamadas ao Discord falso: {stub.calls}")
+        os.chdir(ROOT)
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga local da página do servidor no painel.")
+    parser.add_argument("--tickets", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=8, help="DASHBOARD_THREADS do painel")
+    parser.add_argument("--discord-latency", type=float, default=50, help="latência do Discord falso, em ms")
+    sys.exit(1 if main(parser.parse_args()) else 0)
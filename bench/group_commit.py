@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate  # noqa: E402
+from storage import Storage, _delete_ticket_by_channel, _save_ticket, connect  # noqa: E402
+
+
+def bench_per_call_commit(path: str, ops: int, synchronous: str) -> float:
+    # Comportamento antigo: uma conexão, um commit (um fsync) por evento.
+    conn = connect(path)
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    migrate(conn)
+    t0 = time.perf_counter()
+    for i in range(ops // 2):
+        _save_ticket(conn, 1, i, "support", i)
+        conn.commit()
+        _delete_ticket_by_channel(conn, 1, i)
+        conn.commit()
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    return elapsed
+
+
+async def bench_storage(path: str, ops: int, concurrency: int, max_batch: int, commit_window: float):
+    storage = Storage(path, max_batch=max_batch, commit_window=commit_window)
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def lifecycle(i):
+        async with sem:
+            t0 = time.perf_counter()
+            await storage.save_ticket(1, i, "support", i)
+            await storage.delete_ticket_by_channel(1, i)
+            latencies.append((time.perf_counter() - t0) / 2)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(lifecycle(i) for i in range(ops // 2)))
+    elapsed = time.perf_counter() - t0
+    storage.close()
+    latencies.sort()
+    return elapsed, storage.commits, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        for synchronous in ("FULL", "NORMAL"):
+            elapsed = bench_per_call_commit(os.path.join(tmp, f"per-call-{synchronous}.db"), args.ops, synchronous)
+            print(f"commit por chamada (synchronous={synchronous:6}) {args.ops / elapsed:9.0f} ops/s  commits={args.ops}")
+
+        for max_batch, window in ((1, 0.0), (args.max_batch, 0.0), (args.max_batch, args.window)):
+            path = os.path.join(tmp, f"group-{max_batch}-{window}.db")
+            elapsed, commits, p50, p99 = asyncio.run(bench_storage(path, args.ops, args.concurrency, max_batch, window))
+            print(
+                f"storage (synchronous=FULL) max_batch={max_batch:<4} window={window * 1000:.0f}ms   {args.ops / elapsed:9.0f} ops/s  "
+                f"commits={commits}  p50={p50 * 1000:.2f}ms p99={p99 * 1000:.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Group commit vs. commit por chamada.")
+    parser.add_argument("--ops", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--window", type=float, default=0.002, help="janela extra de coalescência em segundos")
+    main(parser.parse_args())
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord_api import DiscordAPI  # noqa: E402
+
+
+class StubDiscord(ThreadingHTTPServer):
+    """Imita GET /users/@me/guilds com um bucket de rate limit por token."""
+
+    daemon_threads = True
+
+    def __init__(self, limit: int, window: float):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.buckets: dict[str, tuple[float, int]] = {}
+        self.calls = 0
+        self.rate_limited = 0
+
+    def take(self, token: str):
+        now = time.monotonic()
+        with self.lock:
+            self.calls += 1
+            reset_at, used = self.buckets.get(token, (now + self.window, 0))
+            if now >= reset_at:
+                reset_at, used = now + self.window, 0
+            if used >= self.limit:
+                self.rate_limited += 1
+                return False, 0, reset_at - now
+            self.buckets[token] = (reset_at, used + 1)
+            return True, self.limit - used - 1, reset_at - now
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        ok, remaining, reset_after = self.server.take(self.headers.get("Authorization", ""))
+        if ok:
+            status, body = 200, json.dumps([{"id": str(i), "name": f"Servidor {i}", "permissions": "8"} for i in range(50)])
+        else:
+            status, body = 429, json.dumps({"message": "You are being rate limited.", "retry_after": reset_after})
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-RateLimit-Limit", str(self.server.limit))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset-After", f"{reset_after:.3f}")
+        if not ok:
+            self.send_header("Retry-After", f"{reset_after:.3f}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def page_views(admins: int, views: int):
+    # Cada visualização busca os servidores do admin; a página inicial também busca os do bot.
+    for i in range(views):
+        for admin in range(admins):
+            yield f"token-{admin}", i % 3 == 0
+
+
+def run_naive(base: str, admins: int, views: int):
+    failures = 0
+
+    def view(args):
+        token, index = args
+        ok = requests.get(f"{base}/users/@me/guilds", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+        if index:
+            ok &= requests.get(f"{base}/users/@me/guilds?limit=200", headers={"Authorization": "Bot bot"}).status_code == 200
+        return ok
+
+    with ThreadPoolExecutor(max_workers=admins) as pool:
+        failures = sum(not ok for ok in pool.map(view, page_views(admins, views)))
+    return failures
+
+
+def run_client(base: str, admins: int, views: int, ttl: float):
+    api = DiscordAPI(base, user_ttl=ttl, bot_ttl=ttl)
+
+    def view(args):
+        token, index = args
+        ok = api.get_user_guilds(token) is not None
+        if index:
+            ok &= api.get_bot_guild_ids("bot") is not None
+        return ok
+
+    with ThreadPoolExecutor(max_workers=admins) as pool:
+        failures = sum(not ok for ok in pool.map(view, page_views(admins, views)))
+    return failures
+
+
+def main(args):
+    for label, runner in (("requests.get por página", run_naive), ("DiscordAPI", run_client)):
+        server = StubDiscord(args.limit, args.window)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        t0 = time.perf_counter()
+        extra = (args.ttl,) if runner is run_client else ()
+        failures = runner(base, args.admins, args.views, *extra)
+        elapsed = time.perf_counter() - t0
+        server.shutdown()
+        server.server_close()
+
+        total = args.admins * args.views
+        print(
+            f"{label:24} visualizações={total} chamadas={server.calls} 429={server.rate_limited} "
+            f"falhas={failures} tempo={elapsed:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chamadas ao Discord evitadas pelo cliente REST do painel (servidor stub local).")
+    parser.add_argument("--admins", type=int, default=8)
+    parser.add_argument("--views", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5, help="requisições por janela em cada bucket do stub")
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--ttl", type=float, default=60.0)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import Storage  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+async def watch_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def open_close(storage: Storage, guild_id: int, user_id: int, opens: list, closes: list):
+    channel_id = guild_id * 1_000_000 + user_id
+
+    t0 = time.perf_counter()
+    if not await storage.has_open_ticket(guild_id, user_id, "support"):
+        await storage.get_guild_config(guild_id)
+        await storage.save_ticket(guild_id, user_id, "support", channel_id)
+    opens.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await storage.get_guild_config(guild_id)
+    if await storage.get_ticket_by_channel(guild_id, channel_id):
+        await storage.delete_ticket_by_channel(guild_id, channel_id)
+    closes.append(time.perf_counter() - t0)
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(os.path.join(tmp, "bench.db"), readers=args.readers)
+        opens, closes, lags = [], [], []
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(watch_loop_lag(stop, lags))
+
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(i):
+            async with sem:
+                await open_close(storage, i % args.guilds, i, opens, closes)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.tickets)))
+        elapsed = time.perf_counter() - t0
+
+        stop.set()
+        await watcher
+        storage.close()
+
+    ms = 1000
+    print(f"tickets={args.tickets} concurrency={args.concurrency} guilds={args.guilds} readers={args.readers}")
+    print(f"total={elapsed:.2f}s  throughput={args.tickets / elapsed:.0f} open+close/s")
+    print(f"open   p50={percentile(opens, 50) * ms:.2f}ms p99={percentile(opens, 99) * ms:.2f}ms")
+    print(f"close  p50={percentile(closes, 50) * ms:.2f}ms p99={percentile(closes, 99) * ms:.2f}ms")
+    print(f"event loop lag p99={percentile(lags, 99) * ms:.2f}ms max={max(lags, default=0) * ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência do storage com aberturas/fechamentos concorrentes.")
+    parser.add_argument("--tickets", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import Storage, connect, get_transcript_meta, iter_transcript_blob  # noqa: E402
+from transcripts import ARCHIVE_CODEC, TranscriptArchive, TranscriptFiles, iter_archive_text  # noqa: E402
+
+WORDS = "ticket pagamento reembolso pedido erro mod modelo staff ajuda obrigado conta acesso link print".split()
+
+
+class FakeAuthor(SimpleNamespace):
+    def __str__(self):
+        return self.name
+
+
+def fake_messages(channel_id: int, count: int, rng: random.Random):
+    authors = [FakeAuthor(id=1000 + i, name=f"usuario{i}") for i in range(4)]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        attachments = []
+        if rng.random() < 0.1:
+            # Alguns nomes com espaço, para a comparação com o .txt cobrir o escape das referências.
+            name = f"print {i}.png" if i % 3 else f"print{i}.png"
+            attachments = [
+                SimpleNamespace(url=f"https://cdn.discordapp.com/attachments/{channel_id}/{rng.randrange(10**18)}/{name}")
+            ]
+        yield SimpleNamespace(
+            created_at=start + timedelta(seconds=i * 30),
+            author=rng.choice(authors),
+            content=" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))),
+            attachments=attachments,
+            embeds=[],
+        )
+
+
+async def run(args):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        storage = Storage(path)
+
+        raw_total = stored_total = 0
+        attachments = prefix_entries = prefix_bytes = naive_entries = naive_bytes = 0
+        encode_time = store_time = 0.0
+        for channel_id in range(args.transcripts):
+            transcript = TranscriptFiles(f"transcript-1-{channel_id}", 25 * 1024 * 1024)
+            archive = TranscriptArchive()
+            t0 = time.perf_counter()
+            naive = set()
+            for msg in fake_messages(channel_id, args.messages, rng):
+                transcript.add(msg)
+                archive.add(msg)
+                naive.update(a.url.rpartition("/")[0] for a in msg.attachments)
+                attachments += len(msg.attachments)
+            fp = archive.finish()
+            encode_time += time.perf_counter() - t0
+            # Tabela de prefixos (registros P) contra chavear pelo trecho até a última "/".
+            prefix_entries += len(archive._prefixes)
+            prefix_bytes += sum(len(p) for p in archive._prefixes)
+            naive_entries += len(naive)
+            naive_bytes += sum(len(p) for p in naive)
+
+            t0 = time.perf_counter()
+            await storage.save_transcript(1, channel_id, ARCHIVE_CODEC, archive.messages, transcript.bytes, fp, archive.size)
+            store_time += time.perf_counter() - t0
+
+            raw_total += transcript.bytes
+            stored_total += archive.size
+            if channel_id == 0:
+                expected = b"".join(f.fp.read() for f in transcript.files())
+            transcript.close()
+            archive.close()
+        storage.close()
+
+        conn = connect(path)
+        t0 = time.perf_counter()
+        lookups = 0
+        for channel_id in rng.sample(range(args.transcripts), min(args.lookups, args.transcripts)):
+            get_transcript_meta(conn, 1, channel_id)
+            lookups += 1
+        lookup_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        decoded = 0
+        for channel_id in range(args.transcripts):
+            meta = get_transcript_meta(conn, 1, channel_id)
+            out = b"".join(iter_archive_text(iter_transcript_blob(conn, meta["rowid"])))
+            decoded += len(out)
+            if channel_id == 0 and out != expected:
+                raise SystemExit("transcrição decodificada difere do .txt original")
+        read_time = time.perf_counter() - t0
+        conn.close()
+
+    mb = 1024 * 1024
+    print(f"transcripts={args.transcripts} mensagens/ticket={args.messages}")
+    print(f"texto={raw_total / mb:.1f}MB arquivado={stored_total / mb:.2f}MB razão={raw_total / stored_total:.1f}x")
+    print(
+        f"anexos={attachments} prefixos={prefix_entries} ({prefix_bytes / 1024:.1f}KB)  "
+        f"até a última '/': {naive_entries} ({naive_bytes / 1024:.1f}KB)"
+    )
+    print(f"codificação {raw_total / mb / encode_time:.1f} MB/s  gravação {args.transcripts / store_time:.0f} transcrições/s")
+    print(f"lookup {lookup_time / lookups * 1e6:.1f}µs  leitura+descompressão {decoded / mb / read_time:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput do arquivo de transcrições compactadas.")
+    parser.add_argument("--transcripts", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--lookups", type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
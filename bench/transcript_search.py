@@ -0,0 +1,88 @@
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate  # noqa: E402
+from storage import _index_transcript, connect, search_transcripts  # noqa: E402
+
+WORDS = (
+    "ticket pagamento reembolso pedido erro mod modelo staff ajuda obrigado conta acesso link print "
+    "pix boleto cartão estorno cancelamento compra download instalação versão bug crash textura skin "
+    "servidor cargo verificação prazo entrega licença chave ativação suporte urgente"
+).split()
+
+
+def synthetic_transcript(rng: random.Random, channel_id: int, lines: int) -> bytes:
+    out = []
+    for i in range(lines):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 20)))
+        if rng.random() < 0.01:
+            words += f" refund-{rng.randrange(1000)}"
+        out.append(f"[2025-01-01 00:{i % 60:02d}:00 UTC] usuario{rng.randrange(50)} ({rng.randrange(10**6)}): {words}")
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+def main(args):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.db"))
+        migrate(conn)
+
+        # Carga inicial em lote; o custo incremental por fechamento é medido à parte abaixo.
+        t0 = time.perf_counter()
+        batch = []
+        for channel_id in range(args.transcripts):
+            text = synthetic_transcript(rng, channel_id, args.lines).decode("utf-8")
+            batch.append((str(channel_id % args.guilds), channel_id, text))
+            if len(batch) >= 10_000:
+                conn.executemany("INSERT INTO transcript_fts (guild_id, channel_id, content) VALUES (?, ?, ?)", batch)
+                conn.commit()
+                batch.clear()
+        conn.executemany("INSERT INTO transcript_fts (guild_id, channel_id, content) VALUES (?, ?, ?)", batch)
+        conn.commit()
+        build = time.perf_counter() - t0
+        print(f"carga inicial: {args.transcripts} transcrições em {build:.1f}s")
+
+        latencies = []
+        for channel_id in range(args.transcripts, args.transcripts + args.closes):
+            part = io.BytesIO(synthetic_transcript(rng, channel_id, args.lines))
+            t0 = time.perf_counter()
+            _index_transcript(conn, channel_id % args.guilds, channel_id, [part])
+            conn.commit()
+            latencies.append(time.perf_counter() - t0)
+        latencies.sort()
+        print(
+            f"indexação incremental por fechamento: p50={latencies[len(latencies) // 2] * 1000:.2f}ms "
+            f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms"
+        )
+
+        queries = ["reembolso", "estorno pix", "crash textura versão", "refund-42", "licença chave ativação"]
+        for q in queries:
+            latencies = []
+            for _ in range(args.repeat):
+                guild_id = rng.randrange(args.guilds)
+                page = rng.randrange(3)
+                t0 = time.perf_counter()
+                search_transcripts(conn, guild_id, q, 20, page * 20)
+                latencies.append(time.perf_counter() - t0)
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            print(f"{q!r:28} p50={p50:7.2f}ms p99={p99:7.2f}ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência da busca FTS5 em transcrições sintéticas.")
+    parser.add_argument("--transcripts", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--closes", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
@@ -1,158 +1,355 @@
+import argparse
+import asyncio
+import math
 import os
+import re
+import sys
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
-import io
-import sqlite3
-from datetime import datetime, timezone
-
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from channel_index import ChannelIndex
+from inactivity import WARN, InactivityScheduler
+from jobs import JobQueue, JobQueueFull
+from log_sink import LogSink
+from metrics import (
+    INTERACTION_SECONDS,
+    TRANSCRIPT_BYTES,
+    TRANSCRIPT_FETCH_SECONDS,
+    TRANSCRIPT_MESSAGES,
+    discord_trace_config,
+    start_metrics_server,
+    timed,
+    watch_event_loop_lag,
+)
+from shards import ShardMetrics, parse_shard_ids, recommended_shard_count, run_processes
+from storage import BULK_CLOSE_MAX, DAY, Storage
+from transcripts import ARCHIVE_CODEC, TranscriptArchive, TranscriptFiles, batch_files, stream_transcript
 
 COMMAND_PREFIX = "r!"
 DB_FILE = "tickets.db"
 
-DEFAULT_CATEGORY_NAMES = {
-    "support": "📩 Tickets - Suporte",
-    "financeiro": "💰 Tickets - Financeiro",
-    "modcreator": "🧩 Tickets - ModCreator",
-    "modelcreator": "🎭 Tickets - ModelCreator",
-    "formstaff": "🧩 Aplicação - Formulário Staff",
-}
+DEFAULT_TICKET_CATEGORIES = [
+    {
+        "key": "support",
+        "label": "Suporte",
+        "description": "Abrir ticket de suporte",
+        "category_name": "📩 Tickets - Suporte",
+        "embed_title": "🎫 Ticket - Suporte",
+        "channel_prefix": "suporte",
+        "position": 0,
+        "button": 1,
+    },
+    {
+        "key": "financeiro",
+        "label": "Financeiro",
+        "description": "Abrir ticket financeiro",
+        "category_name": "💰 Tickets - Financeiro",
+        "embed_title": "🎫 Ticket - Financeiro",
+        "channel_prefix": "financeiro",
+        "position": 1,
+        "button": 0,
+    },
+    {
+        "key": "modcreator",
+        "label": "ModCreator",
+        "description": "Abrir ticket ModCreator",
+        "category_name": "🧩 Tickets - ModCreator",
+        "embed_title": "🎫 Ticket - ModCreator",
+        "channel_prefix": "modcreator",
+        "position": 2,
+        "button": 0,
+    },
+    {
+        "key": "modelcreator",
+        "label": "ModelCreator",
+        "description": "Abrir ticket ModelCreator",
+        "category_name": "🎭 Tickets - ModelCreator",
+        "embed_title": "🎫 Ticket - ModelCreator",
+        "channel_prefix": "modelcreator",
+        "position": 3,
+        "button": 0,
+    },
+    {
+        "key": "formstaff",
+        "label": "Formulario Staff",
+        "description": "Abrir ticket Formulario Staff",
+        "category_name": "🧩 Aplicação - Formulário Staff",
+        "embed_title": "🎫 Formulario - Aplicação Staff",
+        "channel_prefix": "formstaff",
+        "position": 4,
+        "button": 0,
+    },
+]
+CATEGORY_KEY_PATTERN = r"[a-z0-9_-]{1,32}"
+# Limite do Discord de canais por categoria. Cheia, os tickets vão para "<nome> 2", "<nome> 3"...,
+# gravadas em categories com a chave "<key>#2", "<key>#3" ("#" não é válido numa chave de categoria).
+CATEGORY_CHANNEL_LIMIT = 50
+MAX_CATEGORY_SHARDS = 10
+MAX_SELECT_OPTIONS = 25
 
 DEFAULT_PANEL_CHANNEL_NAME = "painel-ticket"
+TRANSCRIPT_MAX_MESSAGES = int(os.getenv("TRANSCRIPT_MAX_MESSAGES", "0")) or None
+TICKET_WORKERS = int(os.getenv("TICKET_WORKERS", "8"))
+TICKET_QUEUE_SIZE = int(os.getenv("TICKET_QUEUE_SIZE", "500"))
+BOOTSTRAP_CONCURRENCY = int(os.getenv("BOOTSTRAP_CONCURRENCY", "8"))
+# Endpoint /metrics (formato Prometheus) só na interface local; vazio ou 0 desativa.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)
+# Canal de logs: eventos juntados por até LOG_FLUSH_INTERVAL segundos; no máximo LOG_MAX_PENDING na fila de cada canal.
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_MAX_PENDING = int(os.getenv("LOG_MAX_PENDING", "200"))
+LOG_CLOSE_TIMEOUT = 10
+# Fechamento em massa: canais lidos/apagados ao mesmo tempo e tickets gravados por transação.
+BULK_CLOSE_CONCURRENCY = int(os.getenv("BULK_CLOSE_CONCURRENCY", "4"))
+BULK_CLOSE_BATCH = int(os.getenv("BULK_CLOSE_BATCH", "25"))
+BULK_CLOSE_STALE = 600
+# Fechamento por inatividade (0 desativa): aviso no canal AUTO_CLOSE_WARN_HOURS antes de fechar.
+AUTO_CLOSE_HOURS = float(os.getenv("AUTO_CLOSE_HOURS", "0"))
+AUTO_CLOSE_WARN_HOURS = float(os.getenv("AUTO_CLOSE_WARN_HOURS", "12"))
+AUTO_CLOSE_RETRY = 600
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents)
+# SHARD_COUNT vazio = um único gateway sem sharding; "auto" = o Discord recomenda; ou um número.
+# SHARD_IDS restringe este processo a uma faixa ("0-3,8"); normalmente definido por `--processes`.
+SHARD_COUNT = os.getenv("SHARD_COUNT", "").strip().lower()
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS", ""))
 
-conn = sqlite3.connect(DB_FILE)
-cur = conn.cursor()
 
-cur.execute("""
-CREATE TABLE IF NOT EXISTS guild_config (
-    guild_id INTEGER PRIMARY KEY,
-    panel_channel_id INTEGER,
-    log_channel_id INTEGER,
-    staff_role_id INTEGER
-)
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS categories (
-    guild_id INTEGER,
-    key TEXT,
-    category_id INTEGER,
-    name TEXT,
-    PRIMARY KEY (guild_id, key)
-)
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS tickets (
-    guild_id INTEGER,
-    user_id INTEGER,
-    category_key TEXT,
-    channel_id INTEGER,
-    created_at TEXT,
-    PRIMARY KEY (guild_id, user_id, category_key)
-)
-""")
+class LogFlushingBot:
+    async def close(self):
+        # Eventos ainda no buffer do LogSink (inclusive transcrições) saem antes de fechar a sessão HTTP.
+        await log_sink.flush(LOG_CLOSE_TIMEOUT)
+        await super().close()
 
-conn.commit()
 
+class TicketBot(LogFlushingBot, commands.Bot):
+    pass
 
-def get_guild_config(guild_id: int):
-    cur.execute(
-        "SELECT panel_channel_id, log_channel_id, staff_role_id FROM guild_config WHERE guild_id=?",
-        (guild_id,),
-    )
-    row = cur.fetchone()
-    if not row:
-        return {"panel_channel_id": None, "log_channel_id": None, "staff_role_id": None}
-    return {"panel_channel_id": row[0], "log_channel_id": row[1], "staff_role_id": row[2]}
-
-
-def upsert_guild_config(guild_id: int, panel_channel_id=None, log_channel_id=None, staff_role_id=None):
-    existing = get_guild_config(guild_id)
-    panel_channel_id = panel_channel_id if panel_channel_id is not None else existing["panel_channel_id"]
-    log_channel_id = log_channel_id if log_channel_id is not None else existing["log_channel_id"]
-    staff_role_id = staff_role_id if staff_role_id is not None else existing["staff_role_id"]
-
-    cur.execute(
-        """
-        INSERT INTO guild_config (guild_id, panel_channel_id, log_channel_id, staff_role_id)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET
-          panel_channel_id=excluded.panel_channel_id,
-          log_channel_id=excluded.log_channel_id,
-          staff_role_id=excluded.staff_role_id
-        """,
-        (guild_id, panel_channel_id, log_channel_id, staff_role_id),
-    )
-    conn.commit()
-
-
-def set_category(guild_id: int, key: str, category_id: int, name: str):
-    cur.execute(
-        """
-        INSERT INTO categories (guild_id, key, category_id, name)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(guild_id, key) DO UPDATE SET
-          category_id=excluded.category_id,
-          name=excluded.name
-        """,
-        (guild_id, key, category_id, name),
+
+class ShardedTicketBot(LogFlushingBot, commands.AutoShardedBot):
+    pass
+
+
+if SHARD_COUNT or SHARD_IDS:
+    bot = ShardedTicketBot(
+        command_prefix=COMMAND_PREFIX,
+        intents=intents,
+        shard_count=None if SHARD_COUNT in ("", "auto") else int(SHARD_COUNT),
+        shard_ids=SHARD_IDS,
+        http_trace=discord_trace_config(),
     )
-    conn.commit()
+else:
+    bot = TicketBot(command_prefix=COMMAND_PREFIX, intents=intents, http_trace=discord_trace_config())
+
+shard_metrics = ShardMetrics()
+channel_index = ChannelIndex()
+inactivity = InactivityScheduler(int(AUTO_CLOSE_HOURS * 3600), int(AUTO_CLOSE_WARN_HOURS * 3600))
+log_sink = LogSink(flush_interval=LOG_FLUSH_INTERVAL, max_pending=LOG_MAX_PENDING)
+_background_tasks: set[asyncio.Task] = set()
+
+storage = Storage(DB_FILE)
+job_queue = JobQueue(workers=TICKET_WORKERS, maxsize=TICKET_QUEUE_SIZE)
+
+
+# Cache write-through de guild_config/categories: os caminhos quentes não leem o SQLite.
+# Alterações feitas pelo dashboard chegam via tabela config_changes (ver watch_config_changes).
+_guild_config_cache: dict[int, dict] = {}
+_category_cache: dict[tuple[int, str], tuple[int | None, str | None]] = {}
+_ticket_category_cache: dict[int, dict[str, dict]] = {}
+# category_id -> (guild_id, key) e shard em uso de cada (guild_id, key) de ticket.
+_category_keys: dict[int, tuple[int, str]] = {}
+_category_shard: dict[tuple[int, str], int] = {}
+# Canais de ticket sendo criados em cada categoria (ainda fora do channel_index) e shards sendo apagados.
+_category_pending: dict[int, int] = {}
+_category_locks: dict[tuple[int, str], asyncio.Lock] = {}
+_retiring_categories: set[int] = set()
+_last_config_change = 0
+_bootstrapped = False
+
+
+async def get_guild_config(guild_id: int):
+    cfg = _guild_config_cache.get(guild_id)
+    if cfg is None:
+        cfg = await storage.get_guild_config(guild_id)
+        _guild_config_cache[guild_id] = cfg
+    return cfg
+
+
+async def upsert_guild_config(guild_id: int, panel_channel_id=None, log_channel_id=None, staff_role_id=None):
+    await storage.upsert_guild_config(guild_id, panel_channel_id, log_channel_id, staff_role_id)
+    cfg = dict(await get_guild_config(guild_id))
+    for field, value in (
+        ("panel_channel_id", panel_channel_id),
+        ("log_channel_id", log_channel_id),
+        ("staff_role_id", staff_role_id),
+    ):
+        if value is not None:
+            cfg[field] = value
+    _guild_config_cache[guild_id] = cfg
+
+
+def cache_category(guild_id: int, key: str, category_id: int | None, name: str | None):
+    _category_cache[(guild_id, key)] = (category_id, name)
+    if category_id:
+        _category_keys[category_id] = (guild_id, key)
+
+
+async def set_category(guild_id: int, key: str, category_id: int, name: str):
+    await storage.set_category(guild_id, key, category_id, name)
+    cache_category(guild_id, key, category_id, name)
+
+
+async def get_category_id(guild_id: int, key: str):
+    cached = _category_cache.get((guild_id, key))
+    if cached is None:
+        cached = await storage.get_category_id(guild_id, key)
+        cache_category(guild_id, key, *cached)
+    return cached
+
+
+async def get_ticket_categories(guild_id: int) -> dict[str, dict]:
+    # Registro de categorias do servidor (key -> categoria), em ordem de exibição.
+    registry = _ticket_category_cache.get(guild_id)
+    if registry is None:
+        rows = await storage.get_ticket_categories(guild_id)
+        if not rows:
+            await storage.upsert_ticket_categories(guild_id, DEFAULT_TICKET_CATEGORIES, replace=False)
+            rows = await storage.get_ticket_categories(guild_id)
+        registry = {c["key"]: c for c in rows}
+        _ticket_category_cache[guild_id] = registry
+    return registry
+
+
+async def save_ticket_category(guild_id: int, category: dict):
+    await storage.upsert_ticket_categories(guild_id, [category])
+    registry = dict(await get_ticket_categories(guild_id))
+    registry[category["key"]] = category
+    _ticket_category_cache[guild_id] = dict(sorted(registry.items(), key=lambda kv: (kv[1]["position"], kv[0])))
+
+
+async def remove_ticket_category(guild_id: int, key: str):
+    await storage.delete_ticket_category(guild_id, key)
+    registry = dict(await get_ticket_categories(guild_id))
+    registry.pop(key, None)
+    _ticket_category_cache[guild_id] = registry
+
+
+def invalidate_guild_cache(guild_id: int):
+    _guild_config_cache.pop(guild_id, None)
+    _ticket_category_cache.pop(guild_id, None)
+    for cache_key in [k for k in _category_cache if k[0] == guild_id]:
+        del _category_cache[cache_key]
+    for cache_key in [k for k in _category_shard if k[0] == guild_id]:
+        del _category_shard[cache_key]
+
+
+async def warm_guild_cache():
+    global _last_config_change
+    _last_config_change = await storage.get_last_config_change()
+    configs = await storage.get_all_guild_configs()
+    categories = await storage.get_all_categories()
+    registries = await storage.get_all_ticket_categories()
+    for guild_id, rows in registries.items():
+        _ticket_category_cache[guild_id] = {c["key"]: c for c in rows}
+    for guild in bot.guilds:
+        _guild_config_cache[guild.id] = configs.get(
+            guild.id, {"panel_channel_id": None, "log_channel_id": None, "staff_role_id": None}
+        )
+    for (guild_id, key), (category_id, name) in categories.items():
+        cache_category(guild_id, key, category_id, name)
 
 
-def get_category_id(guild_id: int, key: str):
-    cur.execute("SELECT category_id, name FROM categories WHERE guild_id=? AND key=?", (guild_id, key))
-    row = cur.fetchone()
-    if not row:
-        return None, None
-    return row[0], row[1]
+@tasks.loop(seconds=5)
+async def watch_config_changes():
+    global _last_config_change
+    for change_id, guild_id in await storage.get_config_changes(_last_config_change):
+        invalidate_guild_cache(guild_id)
+        _last_config_change = change_id
 
 
-def has_open_ticket(guild_id: int, user_id: int, category_key: str) -> bool:
-    cur.execute(
-        "SELECT 1 FROM tickets WHERE guild_id=? AND user_id=? AND category_key=?",
-        (guild_id, user_id, category_key),
-    )
-    return cur.fetchone() is not None
+def local_shard_ids() -> list[int]:
+    if isinstance(bot, commands.AutoShardedBot):
+        return sorted(bot.shards)
+    return [bot.shard_id or 0]
+
+
+def shard_latencies() -> dict[int, float]:
+    if isinstance(bot, commands.AutoShardedBot):
+        return dict(bot.latencies)
+    return {bot.shard_id or 0: bot.latency}
 
 
-def save_ticket(guild_id: int, user_id: int, category_key: str, channel_id: int):
-    cur.execute(
-        """
-        INSERT OR REPLACE INTO tickets (guild_id, user_id, category_key, channel_id, created_at)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (guild_id, user_id, category_key, channel_id, datetime.now(timezone.utc).isoformat()),
+async def publish_bot_guilds():
+    by_shard: dict[int, list[int]] = {shard_id: [] for shard_id in local_shard_ids()}
+    for guild in bot.guilds:
+        by_shard.setdefault(guild.shard_id, []).append(guild.id)
+    for shard_id, guild_ids in by_shard.items():
+        await storage.sync_bot_guilds(shard_id, guild_ids, bot.shard_count or 1)
+
+
+@tasks.loop(seconds=60)
+async def bot_guilds_heartbeat():
+    # Mantém fresco o conjunto publicado em bot_guilds (o painel usa a API do Discord se ele envelhecer)
+    # e grava latência/eventos por minuto de cada shard deste processo em bot_shards.
+    rates, gateway_rate = shard_metrics.snapshot()
+    latencies = shard_latencies()
+    for shard_id in local_shard_ids():
+        latency = latencies.get(shard_id)
+        await storage.touch_bot_shard(
+            shard_id,
+            bot.shard_count or 1,
+            latency * 1000 if latency is not None and math.isfinite(latency) else None,
+            rates.get(shard_id, 0.0),
+        )
+    print(
+        f"Shards {local_shard_ids()}: gateway {gateway_rate:.0f} eventos/min | "
+        + " | ".join(f"#{shard_id} {rates.get(shard_id, 0.0):.0f}/min" for shard_id in local_shard_ids())
     )
-    conn.commit()
 
 
-def delete_ticket_by_channel(guild_id: int, channel_id: int):
-    cur.execute("DELETE FROM tickets WHERE guild_id=? AND channel_id=?", (guild_id, channel_id))
-    conn.commit()
+async def has_open_ticket(guild_id: int, user_id: int, category_key: str) -> bool:
+    return await storage.has_open_ticket(guild_id, user_id, category_key)
 
 
-def get_ticket_by_channel(guild_id: int, channel_id: int):
-    cur.execute(
-        """
-        SELECT user_id, category_key, created_at FROM tickets
-        WHERE guild_id=? AND channel_id=?
-        """,
-        (guild_id, channel_id),
-    )
-    row = cur.fetchone()
-    if not row:
-        return None
-    return {"user_id": row[0], "category_key": row[1], "created_at": row[2]}
+async def save_ticket(guild_id: int, user_id: int, category_key: str, channel_id: int):
+    await storage.save_ticket(guild_id, user_id, category_key, channel_id)
+
+
+async def delete_ticket_by_channel(guild_id: int, channel_id: int, closed_by: int | None = None, message_count: int | None = None):
+    await storage.delete_ticket_by_channel(guild_id, channel_id, closed_by, message_count)
+
+
+async def get_ticket_by_channel(guild_id: int, channel_id: int):
+    return await storage.get_ticket_by_channel(guild_id, channel_id)
+
+
+# Reservas de abertura em andamento, por (guild_id, user_id, category_key). O event loop é
+# single-thread e não há await entre o teste e o add, então a reserva é atômica: um clique
+# duplicado recebe resposta imediata sem uma segunda chamada à API do Discord.
+_ticket_reservations: set[tuple[int, int, str]] = set()
+
+
+def reserve_ticket_slot(guild_id: int, user_id: int, category_key: str) -> bool:
+    key = (guild_id, user_id, category_key)
+    if key in _ticket_reservations:
+        return False
+    _ticket_reservations.add(key)
+    return True
+
+
+def release_ticket_slot(guild_id: int, user_id: int, category_key: str):
+    _ticket_reservations.discard((guild_id, user_id, category_key))
+
+
+# Canais com fechamento em andamento: um segundo clique em "Fechar" não gera outra transcrição.
+_closing_channels: set[int] = set()
 
 
 def is_staff(member: discord.Member, guild_cfg: dict) -> bool:
@@ -164,56 +361,156 @@ def is_staff(member: discord.Member, guild_cfg: dict) -> bool:
     return False
 
 
-async def log_event(guild: discord.Guild, text: str, *, embed: discord.Embed | None = None):
-    cfg = get_guild_config(guild.id)
+async def log_event(
+    guild: discord.Guild,
+    text: str | None,
+    *,
+    embed: discord.Embed | None = None,
+    files: list[discord.File] | None = None,
+) -> asyncio.Future | None:
+    """Enfileira o evento no canal de logs sem esperar o envio.
+
+    Retorna o future do LogSink (True quando enviado) ou None se o servidor
+    não tem canal de logs; só quem precisa saber do envio (ex.: anexos) espera.
+    """
+    cfg = await get_guild_config(guild.id)
     log_channel_id = cfg.get("log_channel_id")
     if not log_channel_id:
-        return
+        return None
     ch = guild.get_channel(log_channel_id)
-    if isinstance(ch, discord.TextChannel):
-        try:
-            await ch.send(content=text, embed=embed)
-        except Exception:
-            pass
+    if not isinstance(ch, discord.TextChannel):
+        return None
+    return log_sink.submit(ch, text, embed=embed, files=files)
+
+
+def _cached_category(guild: discord.Guild, cat_id: int | None) -> discord.CategoryChannel | None:
+    ch = guild.get_channel(cat_id) if cat_id else None
+    return ch if isinstance(ch, discord.CategoryChannel) else None
 
 
 async def get_or_create_category(guild: discord.Guild, key: str, desired_name: str) -> discord.CategoryChannel:
-    cat_id, _ = get_category_id(guild.id, key)
-    if cat_id:
-        ch = guild.get_channel(cat_id)
-        if isinstance(ch, discord.CategoryChannel):
+    cat_id, _ = await get_category_id(guild.id, key)
+    ch = _cached_category(guild, cat_id)
+    if ch is not None:
+        return ch
+
+    # Jobs concorrentes que encontram a mesma categoria faltando (ex.: o shard seguinte) criam uma só.
+    lock = _category_locks.setdefault((guild.id, key), asyncio.Lock())
+    async with lock:
+        cat_id, _ = await get_category_id(guild.id, key)
+        ch = _cached_category(guild, cat_id)
+        if ch is not None:
             return ch
 
-    for c in guild.categories:
-        if c.name.lower() == desired_name.lower():
-            set_category(guild.id, key, c.id, c.name)
+        c = channel_index.find_category(guild, desired_name)
+        if c is not None:
+            await set_category(guild.id, key, c.id, c.name)
             return c
 
-    cat = await guild.create_category(name=desired_name, reason="Setup automático: categorias do sistema de tickets")
-    set_category(guild.id, key, cat.id, cat.name)
-    return cat
+        cat = await guild.create_category(name=desired_name, reason="Setup automático: categorias do sistema de tickets")
+        await set_category(guild.id, key, cat.id, cat.name)
+        return cat
+
+
+def shard_key(key: str, shard: int) -> str:
+    return key if shard == 1 else f"{key}#{shard}"
+
+
+def category_load(guild: discord.Guild, category_id: int) -> int:
+    if category_id in _retiring_categories:
+        return CATEGORY_CHANNEL_LIMIT
+    return channel_index.category_size(guild, category_id) + _category_pending.get(category_id, 0)
+
+
+def is_category_full_error(e: discord.HTTPException) -> bool:
+    # 50035 (Invalid Form Body) com erro em parent_id: CHANNEL_PARENT_MAX_CHANNELS.
+    return e.code == 50035 and "parent_id" in e.text
+
+
+async def get_ticket_category(
+    guild: discord.Guild, key: str, desired_name: str, skip: set[int] = frozenset()
+) -> discord.CategoryChannel:
+    # Começa pelo shard em uso: no caso comum é uma consulta ao cache e ao channel_index.
+    first = _category_shard.get((guild.id, key), 1)
+    for shard in range(first, first + MAX_CATEGORY_SHARDS):
+        name = desired_name if shard == 1 else f"{desired_name} {shard}"
+        cat = await get_or_create_category(guild, shard_key(key, shard), name)
+        if cat.id not in skip and category_load(guild, cat.id) < CATEGORY_CHANNEL_LIMIT:
+            _category_shard[(guild.id, key)] = shard
+            return cat
+    raise RuntimeError(f"todas as categorias de `{key}` estão cheias ({CATEGORY_CHANNEL_LIMIT} canais cada)")
+
+
+async def create_ticket_channel(
+    guild: discord.Guild, category: dict, name: str, overwrites: dict
+) -> discord.TextChannel:
+    full: set[int] = set()
+    while True:
+        cat = await get_ticket_category(guild, category["key"], category["category_name"], full)
+        # Reserva a vaga antes do await: jobs concorrentes não passam de 50 na mesma categoria.
+        _category_pending[cat.id] = _category_pending.get(cat.id, 0) + 1
+        try:
+            channel = await guild.create_text_channel(
+                name=name,
+                category=cat,
+                overwrites=overwrites,
+                reason="Ticket criado via painel",
+            )
+        except discord.HTTPException as e:
+            if not is_category_full_error(e):
+                raise
+            # O índice estava defasado; é refeito a partir do cache do gateway.
+            full.add(cat.id)
+            channel_index.forget(guild.id)
+            continue
+        finally:
+            _category_pending[cat.id] -= 1
+            if not _category_pending[cat.id]:
+                del _category_pending[cat.id]
+        channel_index.add(channel)
+        return channel
+
+
+async def release_category_slot(guild: discord.Guild, category_id: int):
+    """Um canal saiu da categoria: o shard em uso volta para ela e categorias extras vazias são apagadas."""
+    owner = _category_keys.get(category_id)
+    if owner is None:
+        return
+    guild_id, key = owner
+    base, _, shard = key.partition("#")
+    shard = int(shard or 1)
+    current = _category_shard.get((guild_id, base))
+    if current is not None and shard < current:
+        _category_shard[(guild_id, base)] = shard
+    if shard == 1 or category_load(guild, category_id):
+        return
+
+    _retiring_categories.add(category_id)
+    _category_cache.pop((guild_id, key), None)
+    _category_keys.pop(category_id, None)
+    try:
+        await storage.delete_category(guild_id, key)
+        cat = guild.get_channel(category_id)
+        if cat is not None:
+            await cat.delete(reason="Categoria extra de tickets vazia")
+    except Exception as e:
+        print(f"Falha ao remover a categoria {category_id} ({key}) do servidor {guild_id}: {e!r}")
+    finally:
+        _retiring_categories.discard(category_id)
 
 
 async def get_or_create_text_channel(
     guild: discord.Guild, name: str, category: discord.CategoryChannel | None
 ) -> discord.TextChannel:
-    for ch in guild.text_channels:
-        if ch.name.lower() == name.lower():
-            if category is None or ch.category_id == category.id:
-                return ch
+    ch = channel_index.find_text_channel(guild, name, category.id if category else None)
+    if ch is not None:
+        return ch
     return await guild.create_text_channel(name=name, category=category, reason="Setup automático: canal")
 
 
-def ticket_embed_open(member: discord.Member, category_key: str) -> discord.Embed:
-    titles = {
-        "support": "🎫 Ticket - Suporte",
-        "financeiro": "🎫 Ticket - Financeiro",
-        "modcreator": "🎫 Ticket - ModCreator",
-        "modelcreator": "🎫 Ticket - ModelCreator",
-        "formstaff": "🎫 Formulario - Aplicação Staff",
-    }
+def ticket_embed_open(member: discord.Member, category: dict) -> discord.Embed:
     emb = discord.Embed(
-        title=titles.get(category_key, "🎫 Ticket"),
+        title=category.get("embed_title") or "🎫 Ticket",
         description=(
             f"Olá {member.mention}! Seu ticket foi criado.\n\n"
             f"✅ Aguarde atendimento da equipe.\n"
@@ -225,19 +522,300 @@ def ticket_embed_open(member: discord.Member, category_key: str) -> discord.Embe
     return emb
 
 
-async def fetch_transcript(channel: discord.TextChannel, limit: int = 1500) -> str:
-    lines = []
-    async for msg in channel.history(limit=limit, oldest_first=True):
-        ts = msg.created_at.replace(tzinfo=timezone.utc).astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-        author = f"{msg.author} ({msg.author.id})"
-        content = msg.content or ""
-        if msg.attachments:
-            att = " | ".join(a.url for a in msg.attachments)
-            content = f"{content}\n[anexos] {att}".strip()
-        if msg.embeds:
-            content = f"{content}\n[embeds] {len(msg.embeds)} embed(s)".strip()
-        lines.append(f"[{ts}] {author}: {content}")
-    return "\n".join(lines) if lines else "(sem mensagens)"
+async def read_transcript(guild: discord.Guild, channel: discord.TextChannel) -> tuple[TranscriptFiles, TranscriptArchive]:
+    transcript = TranscriptFiles(f"transcript-{guild.id}-{channel.id}", guild.filesize_limit)
+    archive = TranscriptArchive()
+    try:
+        with TRANSCRIPT_FETCH_SECONDS.time():
+            await stream_transcript(channel, transcript, archive, limit=TRANSCRIPT_MAX_MESSAGES)
+    except BaseException:
+        transcript.close()
+        archive.close()
+        raise
+    TRANSCRIPT_BYTES.observe(transcript.bytes)
+    TRANSCRIPT_MESSAGES.observe(transcript.messages)
+    return transcript, archive
+
+
+async def close_ticket(guild: discord.Guild, channel: discord.TextChannel, ticket: dict, closed_by: discord.abc.User | None):
+    # Roda como job da fila; quem enfileira já marcou o canal em _closing_channels.
+    # closed_by=None é o fechamento automático por inatividade: não conta para nenhum staff.
+    try:
+        transcript, archive = await read_transcript(guild, channel)
+        try:
+            await asyncio.gather(
+                storage.save_transcript(
+                    guild.id,
+                    channel.id,
+                    ARCHIVE_CODEC,
+                    archive.messages,
+                    transcript.bytes,
+                    archive.finish(),
+                    archive.size,
+                ),
+                storage.index_transcript(guild.id, channel.id, transcript.parts),
+            )
+        except Exception as e:
+            print(f"Falha ao arquivar transcrição {channel.id}: {e}")
+        finally:
+            archive.close()
+
+        owner = guild.get_member(ticket["user_id"])
+        emb = discord.Embed(title="🔒 Ticket fechado", color=discord.Color.red())
+        emb.add_field(name="Canal", value=f"{channel.name} (`{channel.id}`)", inline=False)
+        emb.add_field(name="Categoria", value=ticket["category_key"], inline=True)
+        emb.add_field(name="Aberto em", value=ticket["created_at"], inline=True)
+        if closed_by is None:
+            emb.add_field(name="Fechado por", value=f"{bot.user} (automático, por inatividade)", inline=False)
+        else:
+            emb.add_field(name="Fechado por", value=f"{closed_by} (`{closed_by.id}`)", inline=False)
+        if owner:
+            emb.add_field(name="Dono", value=f"{owner} (`{owner.id}`)", inline=False)
+
+        try:
+            # O embed vai junto com o primeiro lote de anexos; os arquivos só são
+            # fechados depois que o LogSink terminar de enviá-los.
+            batches = batch_files(transcript.files(), guild.filesize_limit)
+            sent = [await log_event(guild, "📌 Transcrição anexada abaixo.", embed=emb, files=batches[0])]
+            for files in batches[1:]:
+                sent.append(await log_event(guild, None, files=files))
+            await asyncio.gather(*(f for f in sent if f is not None))
+        finally:
+            transcript.close()
+
+        await delete_ticket_by_channel(guild.id, channel.id, closed_by.id if closed_by else None, archive.messages)
+        inactivity.forget(channel.id)
+        try:
+            await channel.delete(reason="Ticket fechado")
+        except Exception:
+            await log_event(guild, f"⚠️ Não consegui deletar o canal `{channel.id}`. Verifique permissões.")
+    finally:
+        _closing_channels.discard(channel.id)
+
+
+# Servidores com um fechamento em massa em andamento: um pedido por vez em cada servidor.
+_bulk_closing_guilds: set[int] = set()
+
+
+async def bulk_close_tickets(guild: discord.Guild, request: dict, progress) -> tuple[int, int, int]:
+    """Fecha os tickets que casam com o filtro do pedido; retorna (encontrados, fechados, falhas).
+
+    Trabalha em lotes de BULK_CLOSE_BATCH: lê as transcrições com no máximo
+    BULK_CLOSE_CONCURRENCY canais por vez, manda um resumo do lote com os
+    anexos ao canal de logs, grava transcrições e histórico numa única
+    transação e só então apaga os canais. Os buckets por rota e os 429 ficam
+    com o cliente HTTP do discord.py; a concorrência limitada evita esgotar o
+    limite global. `progress(encontrados, fechados, falhas)` roda a cada lote.
+    """
+    opened_before = int(time.time()) - request["min_age"]
+    # Com o filtro "dono saiu" o limite só vale depois de filtrar pelos membros do servidor.
+    limit = None if request["owner_left"] else request["max_tickets"]
+    tickets = await storage.get_bulk_close_candidates(guild.id, request["category_key"], opened_before, limit)
+    if request["owner_left"]:
+        tickets = [t for t in tickets if guild.get_member(t["user_id"]) is None][: request["max_tickets"]]
+    tickets = [t for t in tickets if t["channel_id"] not in _closing_channels]
+    _closing_channels.update(t["channel_id"] for t in tickets)
+
+    matched, closed, failed = len(tickets), 0, 0
+    sem = asyncio.Semaphore(BULK_CLOSE_CONCURRENCY)
+
+    async def prepare(ticket: dict):
+        channel = guild.get_channel(ticket["channel_id"])
+        if not isinstance(channel, discord.TextChannel):
+            return channel, None, None  # canal já apagado: só move o ticket para o histórico
+        async with sem:
+            return (channel, *await read_transcript(guild, channel))
+
+    async def delete(channel: discord.TextChannel):
+        async with sem:
+            await channel.delete(reason="Fechamento em massa de tickets")
+
+    # Canais ainda não processados; se algo falhar no meio (progresso, log), saem de _closing_channels no finally.
+    pending = {t["channel_id"] for t in tickets}
+    try:
+        await progress(matched, closed, failed)
+        for start in range(0, len(tickets), BULK_CLOSE_BATCH):
+            chunk = tickets[start : start + BULK_CLOSE_BATCH]
+            results = await asyncio.gather(*(prepare(t) for t in chunk), return_exceptions=True)
+            ready = []
+            for ticket, result in zip(chunk, results):
+                if isinstance(result, BaseException):
+                    failed += 1
+                    print(f"Falha ao ler o ticket {ticket['channel_id']} no fechamento em massa: {result!r}")
+                else:
+                    ready.append((ticket, *result))
+
+            try:
+                records = []
+                for ticket, _, transcript, archive in ready:
+                    record = {"channel_id": ticket["channel_id"], "closed_by": request["requested_by"], "message_count": None}
+                    if archive is not None:
+                        record["message_count"] = archive.messages
+                        record["archive"] = (ARCHIVE_CODEC, archive.messages, transcript.bytes, archive.finish(), archive.size)
+                        record["parts"] = transcript.parts
+                    records.append(record)
+                await log_bulk_close(guild, request["requested_by"], ready)
+                await storage.archive_closed_tickets(guild.id, records)
+            except Exception as e:
+                print(f"Falha ao arquivar lote do fechamento em massa no servidor {guild.id}: {e!r}")
+                failed += len(ready)
+                archived = []
+            else:
+                archived = ready
+            finally:
+                for _, _, transcript, archive in ready:
+                    if transcript is not None:
+                        transcript.close()
+                        archive.close()
+
+            closed += len(archived)
+            for ticket, _, _, _ in archived:
+                inactivity.forget(ticket["channel_id"])
+            channels = [channel for _, channel, _, _ in archived if channel is not None]
+            deleted = await asyncio.gather(*(delete(ch) for ch in channels), return_exceptions=True)
+            not_deleted = [ch.id for ch, result in zip(channels, deleted) if isinstance(result, BaseException)]
+            if not_deleted:
+                await log_event(guild, f"⚠️ Não consegui deletar {len(not_deleted)} canais: {', '.join(f'`{i}`' for i in not_deleted)}")
+            done = {t["channel_id"] for t in chunk}
+            _closing_channels.difference_update(done)
+            pending.difference_update(done)
+            await progress(matched, closed, failed)
+    finally:
+        _closing_channels.difference_update(pending)
+    return matched, closed, failed
+
+
+async def log_bulk_close(guild: discord.Guild, requested_by: int, ready: list):
+    # Um resumo por lote, com as transcrições do lote juntas em até 10 anexos por mensagem.
+    lines = [f"🧹 Fechamento em massa por <@{requested_by}>: {len(ready)} tickets"]
+    files = []
+    for ticket, channel, transcript, _ in ready:
+        name = channel.name if channel is not None else "canal apagado"
+        lines.append(f"🔒 {name} (`{ticket['channel_id']}`) | cat={ticket['category_key']} | dono=<@{ticket['user_id']}>")
+        if transcript is not None:
+            files.extend(transcript.files())
+    batches = batch_files(files, guild.filesize_limit) or [None]
+    sent = [await log_event(guild, "\n".join(lines), files=batches[0])]
+    for batch in batches[1:]:
+        sent.append(await log_event(guild, None, files=batch))
+    # Os arquivos são fechados pelo chamador; espera o envio antes disso.
+    await asyncio.gather(*(f for f in sent if f is not None))
+
+
+async def run_bulk_close(guild: discord.Guild, request: dict, message: discord.Message | None = None):
+    state = {"matched": 0, "closed": 0, "failed": 0}
+
+    async def progress(matched: int, closed: int, failed: int):
+        state.update(matched=matched, closed=closed, failed=failed)
+        await storage.update_bulk_close(request["id"], matched, closed, failed)
+        if message is not None:
+            try:
+                await message.edit(content=f"🧹 Fechando tickets: {closed}/{matched} ({failed} falhas)…")
+            except Exception:
+                pass
+
+    status = "failed"
+    try:
+        await bulk_close_tickets(guild, request, progress)
+        status = "done"
+    except Exception as e:
+        print(f"Fechamento em massa {request['id']} falhou no servidor {guild.id}: {e!r}")
+    finally:
+        _bulk_closing_guilds.discard(guild.id)
+        await storage.update_bulk_close(request["id"], state["matched"], state["closed"], state["failed"], status)
+    summary = f"{state['closed']}/{state['matched']} tickets fechados ({state['failed']} falhas)"
+    await log_event(guild, f"🧹 Fechamento em massa #{request['id']} {'concluído' if status == 'done' else 'interrompido'}: {summary}")
+    if message is not None:
+        try:
+            await message.edit(content=f"{'✅' if status == 'done' else '❌'} Fechamento em massa: {summary}.")
+        except Exception:
+            pass
+
+
+def start_bulk_close(guild: discord.Guild, request: dict, message: discord.Message | None = None):
+    _bulk_closing_guilds.add(guild.id)
+    task = asyncio.create_task(run_bulk_close(guild, request, message), name=f"bulk-close-{request['id']}")
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@tasks.loop(seconds=5)
+async def watch_bulk_close_requests():
+    # Pedidos feitos pelo painel; cada processo só executa os dos servidores que ele atende.
+    stale_before = int(time.time()) - BULK_CLOSE_STALE
+    for request in await storage.get_pending_bulk_closes(stale_before):
+        guild = bot.get_guild(request["guild_id"])
+        if guild is None or guild.id in _bulk_closing_guilds:
+            continue
+        if await storage.claim_bulk_close(request["id"], stale_before):
+            start_bulk_close(guild, request)
+
+
+async def load_ticket_activity():
+    # Depois de reiniciar, as mensagens que o bot não viu aparecem no last_message_id do cache do gateway.
+    for guild_id, channel_id, last_activity, warned_at in await storage.get_ticket_activity():
+        guild = bot.get_guild(guild_id)
+        channel = guild.get_channel(channel_id) if guild else None
+        if not isinstance(channel, discord.TextChannel):
+            continue
+        if channel.last_message_id:
+            seen = int(discord.utils.snowflake_time(channel.last_message_id).timestamp())
+            # A última mensagem pode ser o próprio aviso, enviado logo depois de warned_at.
+            if seen > last_activity and not (warned_at and seen <= warned_at + 60):
+                last_activity, warned_at = seen, 0
+        inactivity.track(guild_id, channel_id, last_activity, warned_at)
+
+
+async def warn_inactive_ticket(channel: discord.TextChannel):
+    try:
+        await channel.send(
+            f"⏰ Este ticket está sem mensagens e será fechado automaticamente em {AUTO_CLOSE_WARN_HOURS:g} h. "
+            "Envie uma mensagem para mantê-lo aberto."
+        )
+    except Exception as e:
+        print(f"Falha ao avisar inatividade no canal {channel.id}: {e!r}")
+
+
+async def close_inactive_ticket(guild: discord.Guild, channel: discord.TextChannel):
+    # Mesmo caminho do botão "Fechar": job "close", transcrição e log; o fechamento chama inactivity.forget.
+    if channel.id not in _closing_channels:
+        ticket = await get_ticket_by_channel(guild.id, channel.id)
+        if ticket is None:
+            inactivity.forget(channel.id)
+            return
+        _closing_channels.add(channel.id)
+        try:
+            job_queue.submit("close", close_ticket, guild, channel, ticket, None)
+        except JobQueueFull:
+            _closing_channels.discard(channel.id)
+    # Se o job falhar ou a fila estiver cheia, tenta de novo mais tarde.
+    inactivity.retry(channel.id, int(time.time()) + AUTO_CLOSE_RETRY)
+
+
+@tasks.loop(seconds=60)
+async def auto_close_inactive_tickets():
+    for action, guild_id, channel_id in inactivity.due(int(time.time())):
+        guild = bot.get_guild(guild_id)
+        channel = guild.get_channel(channel_id) if guild else None
+        if not isinstance(channel, discord.TextChannel):
+            inactivity.forget(channel_id)
+        elif action == WARN:
+            await warn_inactive_ticket(channel)
+        else:
+            try:
+                await close_inactive_ticket(guild, channel)
+            except Exception as e:
+                print(f"Falha ao fechar ticket inativo {channel_id}: {e!r}")
+                inactivity.retry(channel_id, int(time.time()) + AUTO_CLOSE_RETRY)
+
+    # Atividade acumulada desde o último ciclo: uma escrita em lote por minuto, não uma por mensagem.
+    rows = inactivity.take_dirty()
+    if rows:
+        try:
+            await storage.save_ticket_activity(rows)
+        except Exception as e:
+            inactivity.restore_dirty(rows)
+            print(f"Falha ao gravar atividade dos tickets: {e!r}")
 
 
 class CloseTicketView(discord.ui.View):
@@ -245,6 +823,7 @@ class CloseTicketView(discord.ui.View):
         super().__init__(timeout=None)
 
     @discord.ui.button(label="Fechar", style=discord.ButtonStyle.danger, emoji="🔒", custom_id="ticket:close")
+    @timed(INTERACTION_SECONDS.labels("close"))
     async def close(self, interaction: discord.Interaction, _: discord.ui.Button):
         if not interaction.guild or not isinstance(interaction.user, discord.Member):
             return await interaction.response.send_message("Isso só funciona no servidor.", ephemeral=True)
@@ -253,78 +832,69 @@ class CloseTicketView(discord.ui.View):
             return await interaction.response.send_message("Canal inválido.", ephemeral=True)
 
         guild = interaction.guild
-        cfg = get_guild_config(guild.id)
+        channel = interaction.channel
 
-        ticket = get_ticket_by_channel(guild.id, interaction.channel.id)
-        if not ticket:
-            return await interaction.response.send_message("Ticket não encontrado no banco.", ephemeral=True)
+        if channel.id in _closing_channels:
+            return await interaction.response.send_message("Este ticket já está sendo fechado.", ephemeral=True)
+        _closing_channels.add(channel.id)
 
-        owner_id = ticket["user_id"]
-        if not is_staff(interaction.user, cfg) and interaction.user.id != owner_id:
-            return await interaction.response.send_message("Você não pode fechar este ticket.", ephemeral=True)
+        submitted = False
+        try:
+            cfg = await get_guild_config(guild.id)
 
-        category_key = ticket["category_key"]
-        created_at = ticket["created_at"]
+            ticket = await get_ticket_by_channel(guild.id, channel.id)
+            if not ticket:
+                return await interaction.response.send_message("Ticket não encontrado no banco.", ephemeral=True)
 
-        await interaction.response.send_message("Fechando ticket e gerando transcrição…", ephemeral=True)
+            if not is_staff(interaction.user, cfg) and interaction.user.id != ticket["user_id"]:
+                return await interaction.response.send_message("Você não pode fechar este ticket.", ephemeral=True)
 
-        transcript_txt = await fetch_transcript(interaction.channel, limit=1500)
-        file_name = f"transcript-{guild.id}-{interaction.channel.id}.txt"
-        transcript_file = discord.File(io.BytesIO(transcript_txt.encode("utf-8")), filename=file_name)
+            await interaction.response.send_message("Fechando ticket e gerando transcrição…", ephemeral=True)
+            job_queue.submit("close", close_ticket, guild, channel, ticket, interaction.user)
+            submitted = True
+        except JobQueueFull:
+            await interaction.followup.send("Muitos tickets sendo processados agora. Tente novamente.", ephemeral=True)
+        finally:
+            if not submitted:
+                _closing_channels.discard(channel.id)
 
-        owner = guild.get_member(owner_id)
-        emb = discord.Embed(title="🔒 Ticket fechado", color=discord.Color.red())
-        emb.add_field(name="Canal", value=f"{interaction.channel.name} (`{interaction.channel.id}`)", inline=False)
-        emb.add_field(name="Categoria", value=category_key, inline=True)
-        emb.add_field(name="Aberto em", value=created_at, inline=True)
-        emb.add_field(name="Fechado por", value=f"{interaction.user} (`{interaction.user.id}`)", inline=False)
-        if owner:
-            emb.add_field(name="Dono", value=f"{owner} (`{owner.id}`)", inline=False)
 
-        await log_event(guild, "📌 Transcrição anexada abaixo.", embed=emb)
+@timed(INTERACTION_SECONDS.labels("open"))
+async def open_ticket(interaction: discord.Interaction, category_key: str):
+    if not interaction.guild or not isinstance(interaction.user, discord.Member):
+        return await interaction.response.send_message("Isso só funciona no servidor.", ephemeral=True)
 
-        cfg2 = get_guild_config(guild.id)
-        log_channel_id = cfg2.get("log_channel_id")
-        log_ch = guild.get_channel(log_channel_id) if log_channel_id else None
-        if isinstance(log_ch, discord.TextChannel):
-            await log_ch.send(file=transcript_file)
+    guild = interaction.guild
+    member = interaction.user
 
-        delete_ticket_by_channel(guild.id, interaction.channel.id)
-        try:
-            await interaction.channel.delete(reason="Ticket fechado")
-        except Exception:
-            await log_event(guild, f"⚠️ Não consegui deletar o canal `{interaction.channel.id}`. Verifique permissões.")
+    category = (await get_ticket_categories(guild.id)).get(category_key)
+    if category is None:
+        return await interaction.response.send_message("Essa categoria de ticket não existe mais.", ephemeral=True)
 
+    if not reserve_ticket_slot(guild.id, member.id, category_key):
+        return await interaction.response.send_message("Seu ticket já está sendo criado, aguarde.", ephemeral=True)
 
-class TicketCategorySelect(discord.ui.Select):
-    def __init__(self):
-        options = [
-            discord.SelectOption(label="Financeiro", value="financeiro", description="Abrir ticket financeiro"),
-            discord.SelectOption(label="ModCreator", value="modcreator", description="Abrir ticket ModCreator"),
-            discord.SelectOption(label="ModelCreator", value="modelcreator", description="Abrir ticket ModelCreator"),
-            discord.SelectOption(label="Formulario Staff", value="formstaff", description="Abrir ticket Formulario Staff"),
-        ]
-        super().__init__(
-            placeholder="Selecione o ticket que deseja!",
-            min_values=1,
-            max_values=1,
-            options=options,
-            custom_id="ticket:category_select",
-        )
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        job_queue.submit("open", _open_ticket_job, interaction, category)
+    except JobQueueFull:
+        release_ticket_slot(guild.id, member.id, category_key)
+        await interaction.followup.send("Muitos tickets sendo processados agora. Tente novamente.", ephemeral=True)
+    except Exception:
+        release_ticket_slot(guild.id, member.id, category_key)
+        raise
 
-    async def callback(self, interaction: discord.Interaction):
-        if not interaction.guild or not isinstance(interaction.user, discord.Member):
-            return await interaction.response.send_message("Isso só funciona no servidor.", ephemeral=True)
 
-        guild = interaction.guild
-        member = interaction.user
-        category_key = self.values[0]
+async def _open_ticket_job(interaction: discord.Interaction, category: dict):
+    guild = interaction.guild
+    member = interaction.user
+    category_key = category["key"]
 
-        if has_open_ticket(guild.id, member.id, category_key):
-            return await interaction.response.send_message("Você já possui um ticket dessa categoria aberto.", ephemeral=True)
+    try:
+        if await has_open_ticket(guild.id, member.id, category_key):
+            return await interaction.followup.send(f"Você já possui um ticket de {category['label']} aberto.", ephemeral=True)
 
-        cat = await get_or_create_category(guild, category_key, DEFAULT_CATEGORY_NAMES[category_key])
-        cfg = get_guild_config(guild.id)
+        cfg = await get_guild_config(guild.id)
 
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(view_channel=False),
@@ -339,77 +909,77 @@ class TicketCategorySelect(discord.ui.Select):
                 overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
 
         safe_name = member.display_name.lower().replace(" ", "-")
-        channel_name = f"{category_key}-{safe_name}"
+        channel_name = f"{category['channel_prefix']}-{safe_name}"
 
         try:
-            channel = await guild.create_text_channel(
-                name=channel_name,
-                category=cat,
-                overwrites=overwrites,
-                reason="Ticket criado via painel",
-            )
+            channel = await create_ticket_channel(guild, category, channel_name, overwrites)
         except Exception as e:
             await log_event(guild, f"❌ Erro ao criar ticket ({category_key}) para {member.id}: {e}")
-            return await interaction.response.send_message(f"Erro ao criar ticket: {e}", ephemeral=True)
+            return await interaction.followup.send(f"Erro ao criar ticket: {e}", ephemeral=True)
 
-        save_ticket(guild.id, member.id, category_key, channel.id)
-        await channel.send(content=member.mention, embed=ticket_embed_open(member, category_key), view=CloseTicketView())
+        try:
+            await save_ticket(guild.id, member.id, category_key, channel.id)
+        except Exception as e:
+            # Desfaz a reserva por completo: sem registro no banco, o canal ficaria órfão.
+            try:
+                await channel.delete(reason="Falha ao registrar ticket")
+            except Exception:
+                pass
+            await log_event(guild, f"❌ Erro ao registrar ticket ({category_key}) para {member.id}: {e}")
+            return await interaction.followup.send("Erro ao registrar o ticket. Tente novamente.", ephemeral=True)
+        inactivity.track(guild.id, channel.id, int(time.time()))
+        await channel.send(content=member.mention, embed=ticket_embed_open(member, category), view=CloseTicketView())
+        await interaction.followup.send("Ticket criado com sucesso! ✅", ephemeral=True)
         await log_event(guild, f"✅ Ticket criado: {channel.mention} | cat={category_key} | user={member} ({member.id})")
-        await interaction.response.send_message("Ticket criado com sucesso! ✅", ephemeral=True)
+    finally:
+        release_ticket_slot(guild.id, member.id, category_key)
 
 
-class TicketPanelView(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=None)
-        self.add_item(TicketCategorySelect())
-
-    @discord.ui.button(
-        label="Abrir ticket (Suporte)", style=discord.ButtonStyle.success, emoji="⭐", custom_id="ticket:open_support"
-    )
-    async def open_support(self, interaction: discord.Interaction, _: discord.ui.Button):
-        if not interaction.guild or not isinstance(interaction.user, discord.Member):
-            return await interaction.response.send_message("Isso só funciona no servidor.", ephemeral=True)
-
-        guild = interaction.guild
-        member = interaction.user
-        category_key = "support"
+class TicketCategorySelect(discord.ui.Select):
+    def __init__(self, categories: list[dict] | None = None):
+        options = [
+            discord.SelectOption(label=c["label"], value=c["key"], description=c.get("description") or None)
+            for c in (categories or [])[:MAX_SELECT_OPTIONS]
+        ]
+        super().__init__(
+            placeholder="Selecione o ticket que deseja!",
+            min_values=1,
+            max_values=1,
+            options=options,
+            custom_id="ticket:category_select",
+        )
 
-        if has_open_ticket(guild.id, member.id, category_key):
-            return await interaction.response.send_message("Você já possui um ticket de suporte aberto.", ephemeral=True)
+    async def callback(self, interaction: discord.Interaction):
+        await open_ticket(interaction, self.values[0])
 
-        cat = await get_or_create_category(guild, category_key, DEFAULT_CATEGORY_NAMES[category_key])
-        cfg = get_guild_config(guild.id)
 
-        overwrites = {
-            guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            member: discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True),
-            guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True, manage_channels=True, read_message_history=True),
-        }
+# "ticket:open_support" é o custom_id dos painéis postados antes do registro de categorias.
+class TicketOpenButton(discord.ui.DynamicItem[discord.ui.Button], template=rf"ticket:open[:_](?P<key>{CATEGORY_KEY_PATTERN})"):
+    def __init__(self, key: str, label: str = "Abrir ticket"):
+        super().__init__(
+            discord.ui.Button(label=label, style=discord.ButtonStyle.success, emoji="⭐", custom_id=f"ticket:open:{key}")
+        )
+        self.key = key
 
-        staff_role_id = cfg.get("staff_role_id")
-        if staff_role_id:
-            role = guild.get_role(staff_role_id)
-            if role:
-                overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["key"], item.label)
 
-        safe_name = member.display_name.lower().replace(" ", "-")
-        channel_name = f"suporte-{safe_name}"
+    async def callback(self, interaction: discord.Interaction):
+        await open_ticket(interaction, self.key)
 
-        try:
-            channel = await guild.create_text_channel(
-                name=channel_name,
-                category=cat,
-                overwrites=overwrites,
-                reason="Ticket de suporte criado via painel",
-            )
-        except Exception as e:
-            await log_event(guild, f"❌ Erro ao criar suporte para {member.id}: {e}")
-            return await interaction.response.send_message(f"Erro ao criar ticket: {e}", ephemeral=True)
 
-        save_ticket(guild.id, member.id, category_key, channel.id)
-        await channel.send(content=member.mention, embed=ticket_embed_open(member, category_key), view=CloseTicketView())
-        await log_event(guild, f"✅ Ticket criado: {channel.mention} | cat=support | user={member} ({member.id})")
-        await interaction.response.send_message("Ticket criado com sucesso! ✅", ephemeral=True)
+class TicketPanelView(discord.ui.View):
+    def __init__(self, categories: list[dict] | None = None):
+        super().__init__(timeout=None)
+        categories = categories or []
+        for c in categories:
+            if c["button"]:
+                self.add_item(TicketOpenButton(c["key"], f"Abrir ticket ({c['label']})"))
+        # Sem categorias (registro da view persistente no setup_hook) o select só serve para despacho.
+        menu = [c for c in categories if not c["button"]]
+        if menu or not categories:
+            self.add_item(TicketCategorySelect(menu))
 
 
 class VerifyView(discord.ui.View):
@@ -417,6 +987,7 @@ class VerifyView(discord.ui.View):
         super().__init__(timeout=None)
 
     @discord.ui.button(label="Verificar", style=discord.ButtonStyle.success, custom_id="verify:button")
+    @timed(INTERACTION_SECONDS.labels("verify"))
     async def verify(self, interaction: discord.Interaction, _: discord.ui.Button):
         if not interaction.guild or not isinstance(interaction.user, discord.Member):
             return await interaction.response.send_message("Isso só funciona no servidor.", ephemeral=True)
@@ -455,14 +1026,14 @@ def admin_only():
 @bot.command(name="setup_staff")
 @admin_only()
 async def setup_staff(ctx: commands.Context, role: discord.Role):
-    upsert_guild_config(ctx.guild.id, staff_role_id=role.id)
+    await upsert_guild_config(ctx.guild.id, staff_role_id=role.id)
     await ctx.reply(f"✅ Cargo de staff definido: {role.mention}")
 
 
 @bot.command(name="setup_logs")
 @admin_only()
 async def setup_logs(ctx: commands.Context, channel: discord.TextChannel):
-    upsert_guild_config(ctx.guild.id, log_channel_id=channel.id)
+    await upsert_guild_config(ctx.guild.id, log_channel_id=channel.id)
     await ctx.reply(f"✅ Canal de logs definido: {channel.mention}")
 
 
@@ -470,7 +1041,7 @@ async def setup_logs(ctx: commands.Context, channel: discord.TextChannel):
 @admin_only()
 async def setup_panel(ctx: commands.Context, channel: discord.TextChannel | None = None):
     channel = channel or ctx.channel
-    upsert_guild_config(ctx.guild.id, panel_channel_id=channel.id)
+    await upsert_guild_config(ctx.guild.id, panel_channel_id=channel.id)
     await ctx.reply(f"✅ Canal do painel definido: {channel.mention}")
 
 
@@ -478,13 +1049,20 @@ async def setup_panel(ctx: commands.Context, channel: discord.TextChannel | None
 @admin_only()
 async def post_ticket(ctx: commands.Context):
     await ensure_guild_setup(ctx.guild)
+    categories = list((await get_ticket_categories(ctx.guild.id)).values())
 
     emb = discord.Embed(
         title="🎫 Sistema de Tickets",
         description="Use o botão para abrir ticket de suporte ou escolha uma categoria no menu.",
         color=discord.Color.blue(),
     )
-    await ctx.send(embed=emb, view=TicketPanelView())
+    await ctx.send(embed=emb, view=TicketPanelView(categories))
+    hidden = [c["key"] for c in categories if not c["button"]][MAX_SELECT_OPTIONS:]
+    if hidden:
+        await ctx.reply(
+            f"⚠️ O menu comporta {MAX_SELECT_OPTIONS} categorias; ficaram de fora: "
+            + ", ".join(f"`{k}`" for k in hidden)
+        )
 
 
 @bot.command(name="post_verificar")
@@ -498,6 +1076,110 @@ async def post_verificar(ctx: commands.Context):
     await ctx.send(embed=emb, view=VerifyView())
 
 
+@bot.command(name="category_add")
+@admin_only()
+async def category_add(ctx: commands.Context, key: str, label: str, *, description: str = ""):
+    key = key.lower()
+    if not re.fullmatch(CATEGORY_KEY_PATTERN, key):
+        return await ctx.reply("❌ Chave inválida: use até 32 letras minúsculas, números, `-` ou `_`.")
+
+    registry = await get_ticket_categories(ctx.guild.id)
+    existing = registry.get(key)
+    if existing is None and sum(1 for c in registry.values() if not c["button"]) >= MAX_SELECT_OPTIONS:
+        return await ctx.reply(
+            f"❌ O menu do painel comporta no máximo {MAX_SELECT_OPTIONS} categorias. "
+            f"Remova uma com `{COMMAND_PREFIX}category_remove` antes de adicionar outra."
+        )
+    category = {
+        "key": key,
+        "label": label,
+        "description": description or f"Abrir ticket {label}",
+        "category_name": existing["category_name"] if existing else f"🎫 Tickets - {label}",
+        "embed_title": f"🎫 Ticket - {label}",
+        "channel_prefix": existing["channel_prefix"] if existing else key,
+        "position": existing["position"] if existing else max((c["position"] for c in registry.values()), default=-1) + 1,
+        "button": existing["button"] if existing else 0,
+    }
+    await save_ticket_category(ctx.guild.id, category)
+    await ctx.reply(f"✅ Categoria `{key}` salva. Use `{COMMAND_PREFIX}post_ticket` para repostar o painel.")
+
+
+@bot.command(name="category_remove")
+@admin_only()
+async def category_remove(ctx: commands.Context, key: str):
+    registry = await get_ticket_categories(ctx.guild.id)
+    if key not in registry:
+        return await ctx.reply(f"❌ Categoria `{key}` não existe.")
+    if len(registry) == 1:
+        return await ctx.reply("❌ O servidor precisa de pelo menos uma categoria.")
+    await remove_ticket_category(ctx.guild.id, key)
+    await ctx.reply(f"✅ Categoria `{key}` removida. Use `{COMMAND_PREFIX}post_ticket` para repostar o painel.")
+
+
+@bot.command(name="category_list")
+@admin_only()
+async def category_list(ctx: commands.Context):
+    registry = await get_ticket_categories(ctx.guild.id)
+    lines = [f"- `{c['key']}` → {c['label']}{' (botão)' if c['button'] else ''}" for c in registry.values()]
+    await ctx.reply("**Categorias de ticket:**\n" + "\n".join(lines))
+
+
+@bot.command(name="queue_stats")
+@admin_only()
+async def queue_stats(ctx: commands.Context):
+    st = job_queue.stats()
+    lines = [f"**Fila:** {st['depth']} na fila | {st['running']}/{st['workers']} rodando | {st['completed']} ok | {st['failed']} falhas"]
+    for name, lat in st["jobs"].items():
+        lines.append(
+            f"- `{name}`: espera p50={lat['wait']['p50'] * 1000:.0f}ms p99={lat['wait']['p99'] * 1000:.0f}ms | "
+            f"execução p50={lat['run']['p50'] * 1000:.0f}ms p99={lat['run']['p99'] * 1000:.0f}ms"
+        )
+    await ctx.reply("\n".join(lines))
+
+
+@bot.command(name="shard_stats")
+@admin_only()
+async def shard_stats(ctx: commands.Context):
+    # Lido de bot_shards: inclui os shards de todos os processos, não só deste.
+    now = discord.utils.utcnow().timestamp()
+    lines = []
+    for shard in await storage.get_bot_shards():
+        latency = f"{shard['latency_ms']:.0f}ms" if shard["latency_ms"] is not None else "?"
+        rate = f"{shard['events_per_min']:.0f}/min" if shard["events_per_min"] is not None else "?"
+        lines.append(
+            f"- Shard `{shard['shard_id']}/{shard['shard_count']}` (pid {shard['pid']}): {shard['guild_count']} servidores | "
+            f"latência {latency} | eventos {rate} | heartbeat há {now - shard['heartbeat_at']:.0f}s"
+        )
+    await ctx.reply("\n".join(lines) or "Nenhum shard publicou métricas ainda.")
+
+
+@bot.command(name="close_bulk")
+@admin_only()
+async def close_bulk(ctx: commands.Context, days: int, category_key: str = "todas", owner_filter: str = ""):
+    if days < 0:
+        return await ctx.reply("❌ Informe a idade mínima dos tickets em dias (0 ou mais).")
+    category_key = category_key.lower()
+    if category_key != "todas" and category_key not in await get_ticket_categories(ctx.guild.id):
+        return await ctx.reply(f"❌ Categoria `{category_key}` não existe.")
+    if owner_filter and owner_filter.lower() != "saiu":
+        return await ctx.reply(f"❌ Filtro inválido: use `{COMMAND_PREFIX}close_bulk <dias> [categoria|todas] [saiu]`.")
+    if ctx.guild.id in _bulk_closing_guilds:
+        return await ctx.reply("❌ Já há um fechamento em massa em andamento neste servidor.")
+
+    request = {
+        "guild_id": ctx.guild.id,
+        "requested_by": ctx.author.id,
+        "category_key": None if category_key == "todas" else category_key,
+        "min_age": days * DAY,
+        "owner_left": bool(owner_filter),
+        "max_tickets": BULK_CLOSE_MAX,
+    }
+    # Registrado já como "running" para aparecer no painel; o watcher não o pega de novo.
+    request["id"] = await storage.request_bulk_close(**request, status="running")
+    message = await ctx.reply("🧹 Procurando tickets para fechar…")
+    start_bulk_close(ctx.guild, request, message)
+
+
 @bot.command(name="help_ticket")
 async def help_ticket(ctx: commands.Context):
     txt = (
@@ -506,7 +1188,13 @@ async def help_ticket(ctx: commands.Context):
         f"- `{COMMAND_PREFIX}setup_logs #canal` → define onde o bot envia logs e transcrições\n"
         f"- `{COMMAND_PREFIX}setup_panel #canal` → define onde você quer postar os painéis\n"
         f"- `{COMMAND_PREFIX}post_ticket` → posta o painel de tickets\n"
-        f"- `{COMMAND_PREFIX}post_verificar` → posta o painel de verificação\n\n"
+        f"- `{COMMAND_PREFIX}post_verificar` → posta o painel de verificação\n"
+        f"- `{COMMAND_PREFIX}category_add chave \"Nome\" [descrição]` → cria/edita uma categoria de ticket\n"
+        f"- `{COMMAND_PREFIX}category_remove chave` / `{COMMAND_PREFIX}category_list` → remove / lista categorias\n"
+        f"- `{COMMAND_PREFIX}queue_stats` → mostra a fila de jobs (profundidade e latência)\n"
+        f"- `{COMMAND_PREFIX}shard_stats` → latência, servidores e eventos por minuto de cada shard\n"
+        f"- `{COMMAND_PREFIX}close_bulk dias [categoria|todas] [saiu]` → fecha até {BULK_CLOSE_MAX} tickets abertos há pelo menos N dias "
+        "(opcional: só de uma categoria / só de quem saiu do servidor)\n\n"
         "**Uso (membros):**\n"
         "- Abra um ticket no painel e aguarde atendimento.\n"
         "- Para fechar, clique em **Fechar** (dono do ticket ou staff).\n"
@@ -515,30 +1203,170 @@ async def help_ticket(ctx: commands.Context):
 
 
 async def ensure_guild_setup(guild: discord.Guild):
-    for key, name in DEFAULT_CATEGORY_NAMES.items():
-        await get_or_create_category(guild, key, name)
+    registry = await get_ticket_categories(guild.id)
+    cats = {}
+    for key, category in registry.items():
+        cats[key] = await get_or_create_category(guild, key, category["category_name"])
 
-    cfg = get_guild_config(guild.id)
+    cfg = await get_guild_config(guild.id)
     panel_id = cfg.get("panel_channel_id")
 
-    support_cat = await get_or_create_category(guild, "support", DEFAULT_CATEGORY_NAMES["support"])
-    if not panel_id:
-        panel_ch = await get_or_create_text_channel(guild, DEFAULT_PANEL_CHANNEL_NAME, support_cat)
-        upsert_guild_config(guild.id, panel_channel_id=panel_ch.id)
+    if not panel_id and cats:
+        panel_cat = cats.get("support") or next(iter(cats.values()))
+        panel_ch = await get_or_create_text_channel(guild, DEFAULT_PANEL_CHANNEL_NAME, panel_cat)
+        await upsert_guild_config(guild.id, panel_channel_id=panel_ch.id)
+
+
+def guild_setup_is_valid(guild: discord.Guild, registry: dict, cfg: dict) -> bool:
+    # Só caches em memória e o cache do gateway: nenhuma chamada REST.
+    if not cfg.get("panel_channel_id"):
+        return False
+    for key in registry:
+        cat_id, _ = _category_cache.get((guild.id, key), (None, None))
+        if not cat_id or not isinstance(guild.get_channel(cat_id), discord.CategoryChannel):
+            return False
+    return True
+
+
+async def bootstrap_guild(guild: discord.Guild, sem: asyncio.Semaphore) -> str:
+    async with sem:
+        registry = await get_ticket_categories(guild.id)
+        cfg = await get_guild_config(guild.id)
+        if guild_setup_is_valid(guild, registry, cfg):
+            return "skipped"
+        t0 = time.perf_counter()
+        try:
+            await ensure_guild_setup(guild)
+        except Exception as e:
+            print(f"Falha no setup do servidor {guild.id}: {e}")
+            return "failed"
+        print(f"Setup do servidor {guild.id} ({guild.name}) em {time.perf_counter() - t0:.2f}s")
+        return "done"
+
+
+async def bootstrap_guilds(guilds: list[discord.Guild]):
+    t0 = time.perf_counter()
+    sem = asyncio.Semaphore(BOOTSTRAP_CONCURRENCY)
+    results = await asyncio.gather(*(bootstrap_guild(guild, sem) for guild in guilds))
+    print(
+        f"Bootstrap de {len(guilds)} servidores em {time.perf_counter() - t0:.1f}s: "
+        f"{results.count('done')} configurados, {results.count('skipped')} já válidos, {results.count('failed')} falhas"
+    )
+
+
+@bot.event
+async def setup_hook():
+    job_queue.start()
+    _background_tasks.add(asyncio.create_task(watch_event_loop_lag(), name="event-loop-lag"))
+    if METRICS_PORT:
+        await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        print(f"Métricas em http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    bot.add_view(TicketPanelView())
+    bot.add_view(CloseTicketView())
+    bot.add_view(VerifyView())
+    bot.add_dynamic_items(TicketOpenButton)
 
 
 @bot.event
 async def on_ready():
+    global _bootstrapped
+    # Depois de uma reconexão completa os objetos de canal são recriados; o índice é refeito sob demanda.
+    channel_index.clear()
     print(f"✅ Conectado como {bot.user} (ID: {bot.user.id})")
-    for guild in bot.guilds:
-        try:
-            await ensure_guild_setup(guild)
-        except Exception as e:
-            print(f"Falha no setup do servidor {guild.id}: {e}")
+    await warm_guild_cache()
+    await publish_bot_guilds()
+    if not watch_config_changes.is_running():
+        watch_config_changes.start()
+    if not watch_bulk_close_requests.is_running():
+        watch_bulk_close_requests.start()
+    if not bot_guilds_heartbeat.is_running():
+        bot_guilds_heartbeat.start()
+    # on_ready dispara de novo a cada reconexão completa; o bootstrap roda uma vez por processo.
+    if _bootstrapped:
+        return
+    _bootstrapped = True
+    if AUTO_CLOSE_HOURS:
+        await load_ticket_activity()
+        auto_close_inactive_tickets.start()
+    await bootstrap_guilds(list(bot.guilds))
+
+
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    await storage.add_bot_guild(guild.shard_id, guild.id)
+    await bootstrap_guilds([guild])
+
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    await storage.remove_bot_guild(guild.shard_id, guild.id)
+    invalidate_guild_cache(guild.id)
+    channel_index.forget(guild.id)
+
+
+@bot.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    channel_index.add(channel)
+
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    channel_index.remove(channel)
+    inactivity.forget(channel.id)
+    if channel.category_id:
+        await release_category_slot(channel.guild, channel.category_id)
+
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    if before.name != after.name or before.type != after.type or before.category_id != after.category_id:
+        channel_index.remove(before)
+        channel_index.add(after)
+    if before.category_id and before.category_id != after.category_id:
+        await release_category_slot(after.guild, before.category_id)
+
+
+@bot.event
+async def on_socket_event_type(event_type: str):
+    shard_metrics.record_gateway()
+
+
+@bot.listen("on_message")
+async def count_message_event(message: discord.Message):
+    if message.guild:
+        shard_metrics.record(message.guild.shard_id)
+
+
+@bot.listen("on_message")
+async def track_ticket_activity(message: discord.Message):
+    # Só memória: o InactivityScheduler grava em lote a cada ciclo de auto_close_inactive_tickets.
+    if message.guild and not message.author.bot:
+        inactivity.touch(message.channel.id, int(message.created_at.timestamp()))
+
+
+@bot.listen("on_interaction")
+async def count_interaction_event(interaction: discord.Interaction):
+    if interaction.guild:
+        shard_metrics.record(interaction.guild.shard_id)
 
 
 if __name__ == "__main__":
     token = os.getenv("DISCORD_TOKEN")
     if not token:
         raise RuntimeError("Defina a variável de ambiente DISCORD_TOKEN com o token do bot.")
-    bot.run(token)
+
+    parser = argparse.ArgumentParser(description="Bot de tickets.")
+    parser.add_argument("--shards", help='número de shards ou "auto" (padrão: sem sharding)')
+    parser.add_argument("--processes", type=int, default=1, help="divide os shards entre N processos")
+    args = parser.parse_args()
+
+    if args.shards:
+        # O processo atual vira só o supervisor; cada filho lê SHARD_COUNT/SHARD_IDS do ambiente.
+        storage.close()
+        shard_count = recommended_shard_count(token) if args.shards.lower() == "auto" else int(args.shards)
+        sys.exit(run_processes(os.path.abspath(__file__), shard_count, args.processes))
+
+    try:
+        bot.run(token)
+    finally:
+        storage.close()
@@ -0,0 +1,106 @@
+import discord
+
+TEXT_CHANNEL_TYPES = (discord.ChannelType.text, discord.ChannelType.news)
+
+
+class _GuildIndex:
+    __slots__ = ("categories", "text_channels", "children")
+
+    def __init__(self):
+        self.categories: dict[str, list[int]] = {}
+        self.text_channels: dict[str, list[int]] = {}
+        # category_id -> IDs dos canais dentro dela (de qualquer tipo; todos contam no limite de 50).
+        self.children: dict[int, set[int]] = {}
+
+
+class ChannelIndex:
+    """Índice nome (minúsculo) → IDs de categorias e canais de texto, por servidor.
+
+    Cada servidor é indexado na primeira consulta a partir do cache do gateway
+    e depois mantido pelos eventos on_guild_channel_create/delete/update.
+    Os IDs encontrados são conferidos no cache do gateway; se o índice estiver
+    defasado (ex.: depois de uma reconexão), o servidor é reindexado. Também
+    guarda os canais de cada categoria, para `category_size` em O(1).
+    """
+
+    def __init__(self):
+        self._guilds: dict[int, _GuildIndex] = {}
+
+    def _table(self, index: _GuildIndex, channel) -> dict[str, list[int]] | None:
+        if channel.type == discord.ChannelType.category:
+            return index.categories
+        if channel.type in TEXT_CHANNEL_TYPES:
+            return index.text_channels
+        return None
+
+    def _build(self, guild) -> _GuildIndex:
+        index = _GuildIndex()
+        for channel in guild.categories:
+            index.categories.setdefault(channel.name.lower(), []).append(channel.id)
+        for channel in guild.text_channels:
+            index.text_channels.setdefault(channel.name.lower(), []).append(channel.id)
+        for channel in guild.channels:
+            if getattr(channel, "category_id", None):
+                index.children.setdefault(channel.category_id, set()).add(channel.id)
+        self._guilds[guild.id] = index
+        return index
+
+    def _lookup(self, guild, kind: str, name: str, category_id: int | None = None, rebuilt: bool = False):
+        index = self._guilds.get(guild.id)
+        if index is None:
+            index, rebuilt = self._build(guild), True
+        name = name.lower()
+        for channel_id in getattr(index, kind).get(name, ()):
+            channel = guild.get_channel(channel_id)
+            if channel is None or channel.name.lower() != name:
+                if rebuilt:
+                    continue
+                self._guilds.pop(guild.id, None)
+                return self._lookup(guild, kind, name, category_id, rebuilt=True)
+            if category_id is None or channel.category_id == category_id:
+                return channel
+        return None
+
+    def find_category(self, guild, name: str):
+        return self._lookup(guild, "categories", name)
+
+    def find_text_channel(self, guild, name: str, category_id: int | None = None):
+        return self._lookup(guild, "text_channels", name, category_id)
+
+    def category_size(self, guild, category_id: int) -> int:
+        index = self._guilds.get(guild.id) or self._build(guild)
+        return len(index.children.get(category_id, ()))
+
+    def add(self, channel):
+        index = self._guilds.get(channel.guild.id)
+        if index is None:
+            return
+        table = self._table(index, channel)
+        if table is not None:
+            ids = table.setdefault(channel.name.lower(), [])
+            if channel.id not in ids:
+                ids.append(channel.id)
+        if getattr(channel, "category_id", None):
+            index.children.setdefault(channel.category_id, set()).add(channel.id)
+
+    def remove(self, channel):
+        index = self._guilds.get(channel.guild.id)
+        if index is None:
+            return
+        table = self._table(index, channel)
+        name = channel.name.lower()
+        if table is not None and channel.id in table.get(name, ()):
+            table[name].remove(channel.id)
+            if not table[name]:
+                del table[name]
+        children = index.children.get(getattr(channel, "category_id", None))
+        if children is not None:
+            children.discard(channel.id)
+            if not children:
+                del index.children[channel.category_id]
+
+    def forget(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def clear(self):
+        self._guilds.clear()
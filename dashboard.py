@@ -1,10 +1,24 @@
-
+import json
 import os
+import queue
 import secrets
 import sqlite3
-import requests
-from flask import Flask, render_template, session, redirect, request, url_for, flash
+import threading
+import time
+from contextlib import closing
+from flask import Flask, Response, g, render_template, session, redirect, request, url_for, flash
 from dotenv import load_dotenv
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from discord_api import API_BASE_URL, DiscordAPI, DiscordRateLimited
+from metrics import DASHBOARD_REQUEST_SECONDS, REGISTRY
+from migrations import migrate
+from stats import RECENT_TICKETS_PAGE_SIZE, get_guild_stats, get_recent_tickets, get_recent_transcripts, get_staff_stats, get_ticket_timeseries
+from storage import DAY, HOUR, connect
+from storage import BULK_CLOSE_MAX, get_bulk_closes, get_ticket_categories, request_bulk_close
+from storage import get_bot_guild_membership, get_transcript_meta, iter_transcript_blob, record_config_change, search_transcripts
+from storage import get_ticket_event_bounds, get_ticket_events
+from transcripts import iter_archive_text
 
 load_dotenv()
 
@@ -24,23 +38,96 @@ app.config.update(
 CLIENT_ID = os.getenv("DISCORD_CLIENT_ID")
 CLIENT_SECRET = os.getenv("DISCORD_CLIENT_SECRET")
 REDIRECT_URI = os.getenv("DISCORD_REDIRECT_URI", "http://localhost:5000/callback")
-API_BASE_URL = "https://discord.com/api/v10"
 DB_FILE = "tickets.db"
+SEARCH_PAGE_SIZE = 20
+MAX_STATS_DAYS = 365
+# `python dashboard.py` sobe o servidor de produção (waitress, se instalado) com DASHBOARD_THREADS workers;
+# DASHBOARD_DEBUG=true volta ao servidor de desenvolvimento do Flask.
+DASHBOARD_HOST = os.getenv("DASHBOARD_HOST", "127.0.0.1")
+DASHBOARD_PORT = int(os.getenv("DASHBOARD_PORT", "5000"))
+DASHBOARD_THREADS = int(os.getenv("DASHBOARD_THREADS", "8"))
+DASHBOARD_DEBUG = os.getenv("DASHBOARD_DEBUG", "false").lower() == "true"
+# Painel ao vivo (/server/<id>/events): cada stream SSE ocupa um worker, então há um limite de streams
+# simultâneos; cada conexão dura EVENTS_STREAM_SECONDS e o navegador reconecta de onde parou.
+DASHBOARD_MAX_STREAMS = int(os.getenv("DASHBOARD_MAX_STREAMS", "0")) or max(DASHBOARD_THREADS // 2, 1)
+EVENTS_POLL_INTERVAL = 1.0
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_SECONDS = 300
+EVENTS_RETRY_MS = 3000
+EVENTS_BUSY_RETRY_MS = 30000
+
+# Uma instância por processo: a Session e os caches são compartilhados entre requisições.
+discord_api = DiscordAPI(
+    os.getenv("DISCORD_API_BASE_URL", API_BASE_URL),
+    user_ttl=float(os.getenv("DASHBOARD_USER_GUILDS_TTL", "60")),
+    bot_ttl=float(os.getenv("DASHBOARD_BOT_GUILDS_TTL", "300")),
+)
+
+class ReadPool:
+    """Conexões SQLite somente leitura (WAL, query_only) reaproveitadas entre requisições.
+
+    Cada requisição pega uma conexão e a devolve no fim; até `size` ficam
+    ociosas (uma por worker), então abrir o banco e aquecer o cache de páginas
+    não se repete a cada acesso. Com size=0 volta a ser uma conexão por requisição.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            conn = connect(self.path)
+            conn.execute("PRAGMA query_only=ON")
+            conn.row_factory = sqlite3.Row
+            return conn
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
+    # Só para escritas (configuração, fechamento em massa); leituras usam get_db().
+    conn = connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     return conn
 
-def get_user_admin_guilds(access_token):
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(f"{API_BASE_URL}/users/@me/guilds", headers=headers)
+# O painel pode subir antes do bot; as migrações são as mesmas do storage.py.
+with closing(sqlite3.connect(DB_FILE)) as _conn:
+    migrate(_conn)
+
+read_pool = ReadPool(DB_FILE, DASHBOARD_THREADS)
+_event_streams = threading.BoundedSemaphore(DASHBOARD_MAX_STREAMS)
+
+
+def get_db() -> sqlite3.Connection:
+    # Conexão de leitura da requisição; volta ao pool em release_db.
+    if "db" not in g:
+        g.db = read_pool.acquire()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db(error):
+    conn = g.pop("db", None)
+    if conn is not None:
+        read_pool.release(conn)
 
-    if response.status_code != 200:
+def get_user_admin_guilds(access_token):
+    guilds = discord_api.get_user_guilds(access_token)
+    if guilds is None:
         return []
 
     admin_guilds = []
-    for guild in response.json():
+    for guild in guilds:
         perms = int(guild.get("permissions", 0))
         if perms & 0x8:
             admin_guilds.append(guild)
@@ -59,6 +146,21 @@ def get_authorized_guild(guild_id):
     return None
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request_time(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        # Rótulo pela regra da rota (/server/<int:guild_id>), não pela URL, para não criar uma série por servidor.
+        endpoint = request.url_rule.rule if request.url_rule else "404"
+        DASHBOARD_REQUEST_SECONDS.labels(request.method, endpoint, response.status_code).observe(time.perf_counter() - started)
+    return response
+
+
 def get_csrf_token():
     if "csrf_token" not in session:
         session["csrf_token"] = secrets.token_urlsafe(32)
@@ -72,19 +174,27 @@ def index():
 
     admin_guilds = get_user_admin_guilds(session["token"])
 
-    bot_token = os.getenv("DISCORD_TOKEN")
-    bot_guilds_ids = set()
-    if bot_token:
-        headers_bot = {"Authorization": f"Bot {bot_token}"}
-        r_bot = requests.get(f"{API_BASE_URL}/users/@me/guilds?limit=200", headers=headers_bot)
-        if r_bot.status_code == 200:
-            bot_guilds_ids = {g["id"] for g in r_bot.json()}
+    # O bot publica seus servidores em bot_guilds; a API do Discord só é usada se esse conjunto estiver vencido.
+    published = get_bot_guild_membership(get_db(), [g["id"] for g in admin_guilds])
+
+    if published is not None:
+        bot_guilds_ids = {str(guild_id) for guild_id in published}
+    else:
+        bot_token = os.getenv("DISCORD_TOKEN")
+        bot_guilds_ids = (discord_api.get_bot_guild_ids(bot_token) or set()) if bot_token else set()
 
     for guild in admin_guilds:
         guild["has_bot"] = guild["id"] in bot_guilds_ids
 
     return render_template("index.html", guilds=admin_guilds, client_id=CLIENT_ID)
 
+@app.route("/metrics")
+def metrics():
+    # Só para o Prometheus local; atrás de um proxy, não exponha esta rota.
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return "Não encontrado.", 404
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route("/login")
 def login():
     if not CLIENT_ID or not CLIENT_SECRET:
@@ -108,7 +218,7 @@ def callback():
         "scope": "identify guilds"
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    r = requests.post(f"{API_BASE_URL}/oauth2/token", data=data, headers=headers)
+    r = discord_api.request("POST", "/oauth2/token", data=data, headers=headers)
     
     if r.status_code != 200:
         return f"Erro no login: {r.text}", 400
@@ -116,8 +226,7 @@ def callback():
     token_json = r.json()
     access_token = token_json["access_token"]
     
-    user_headers = {"Authorization": f"Bearer {access_token}"}
-    r_user = requests.get(f"{API_BASE_URL}/users/@me", headers=user_headers)
+    r_user = discord_api.request("GET", "/users/@me", auth=f"Bearer {access_token}")
     
     if r_user.status_code == 200:
         user_data = r_user.json()
@@ -128,8 +237,14 @@ def callback():
         
     return "Erro ao obter dados do usuário", 400
 
+@app.errorhandler(DiscordRateLimited)
+def discord_rate_limited(error):
+    return f"O Discord limitou as requisições; tente novamente em {error.retry_after:.0f}s.", 503, {"Retry-After": str(int(error.retry_after) + 1)}
+
 @app.route("/logout")
 def logout():
+    if "token" in session:
+        discord_api.forget_user(session["token"])
     session.clear()
     return redirect("/")
 
@@ -143,28 +258,137 @@ def server_dashboard(guild_id):
         flash("Você não tem permissão para acessar este servidor.", "error")
         return redirect("/")
 
-    conn = get_db_connection()
+    conn = get_db()
 
-    stats = {
-        "open_tickets": conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=?", (guild_id,)).fetchone()[0],
-        "total_tickets": conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=?", (guild_id,)).fetchone()[0],
-        "support": conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND category_key='support'", (guild_id,)).fetchone()[0],
-        "finance": conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND category_key='financeiro'", (guild_id,)).fetchone()[0],
-        "modcreator": conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND category_key='modcreator'", (guild_id,)).fetchone()[0],
-        "modelcreator": conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND category_key='modelcreator'", (guild_id,)).fetchone()[0],
-        "formstaff": conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND category_key='formstaff'", (guild_id,)).fetchone()[0],
-    }
+    # Tudo no mesmo snapshot: o stream de /events continua exatamente a partir de last_event_id.
+    conn.execute("BEGIN")
+    _, last_event_id = get_ticket_event_bounds(conn)
+
+    stats = get_guild_stats(conn, guild_id)
 
     config_row = conn.execute("SELECT * FROM guild_config WHERE guild_id=?", (guild_id,)).fetchone()
     config = dict(config_row) if config_row else {}
 
-    recent_tickets = conn.execute("SELECT * FROM tickets WHERE guild_id=?", (guild_id,)).fetchall()
+    page = max(request.args.get("page", 1, type=int), 1)
+    recent_tickets, has_next = get_recent_tickets(conn, guild_id, page)
 
-    conn.close()
+    recent_transcripts = get_recent_transcripts(conn, guild_id)
+
+    # Até 2 dias o gráfico usa os agregados por hora; acima disso, por dia.
+    days = min(max(request.args.get("days", 30, type=int), 1), MAX_STATS_DAYS)
+    if days <= 2:
+        timeseries = get_ticket_timeseries(conn, guild_id, HOUR, days * 24)
+    else:
+        timeseries = get_ticket_timeseries(conn, guild_id, DAY, days)
+    staff_stats = get_staff_stats(conn, guild_id, days)
+
+    ticket_categories = get_ticket_categories(conn, guild_id)
+    bulk_closes = get_bulk_closes(conn, guild_id)
+    conn.commit()
 
     guild_name = guild.get("name") or f"Servidor {guild_id}"
     
-    return render_template("dashboard.html", guild_id=guild_id, guild_name=guild_name, stats=stats, config=config, recent_tickets=recent_tickets, csrf_token=get_csrf_token())
+    return render_template("dashboard.html", guild_id=guild_id, guild_name=guild_name, stats=stats, config=config, recent_tickets=recent_tickets, page=page, has_next=has_next, recent_transcripts=recent_transcripts, days=days, timeseries=timeseries, staff_stats=staff_stats, ticket_categories=ticket_categories, bulk_closes=bulk_closes, bulk_close_max=BULK_CLOSE_MAX, last_event_id=last_event_id, recent_page_size=RECENT_TICKETS_PAGE_SIZE, csrf_token=get_csrf_token())
+
+def _sse(event: dict) -> str:
+    # IDs do Discord passam de 2^53: vão como texto para o JavaScript.
+    data = {k: str(v) if k in ("channel_id", "user_id", "closed_by") and v is not None else v for k, v in event.items()}
+    return f"id: {event['id']}\nevent: ticket\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/server/<int:guild_id>/events")
+def ticket_events(guild_id):
+    if "user" not in session:
+        return "Não autenticado.", 401
+
+    if not get_authorized_guild(guild_id):
+        return "Sem permissão para este servidor.", 403
+
+    # Na reconexão o navegador manda o último ID recebido; na primeira, vale o `since` da página.
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", 0, type=int)
+
+    if not _event_streams.acquire(blocking=False):
+        # Streams esgotados: resposta vazia, e o EventSource tenta de novo mais tarde sem prender um worker.
+        return Response(f"retry: {EVENTS_BUSY_RETRY_MS}\n\n", mimetype="text/event-stream")
+    conn = read_pool.acquire()
+
+    def generate():
+        last = since
+        first, _ = get_ticket_event_bounds(conn)
+        if first and last < first - 1:
+            # Mudanças já descartadas da tabela: só recarregando a página o painel fica correto.
+            yield "event: reload\ndata: {}\n\n"
+            return
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        deadline = time.monotonic() + EVENTS_STREAM_SECONDS
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline:
+            events = get_ticket_events(conn, guild_id, last)
+            for event in events:
+                last = event["id"]
+                yield _sse(event)
+            if events:
+                quiet_since = time.monotonic()
+            elif time.monotonic() - quiet_since >= EVENTS_HEARTBEAT:
+                yield ": ping\n\n"
+                quiet_since = time.monotonic()
+            time.sleep(EVENTS_POLL_INTERVAL)
+
+    def release():
+        read_pool.release(conn)
+        _event_streams.release()
+
+    # call_on_close roda quando o servidor fecha a resposta, mesmo que o gerador nem tenha começado.
+    response = Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(release)
+    return response
+
+@app.route("/server/<int:guild_id>/transcripts/<int:channel_id>")
+def transcript_view(guild_id, channel_id):
+    if "user" not in session:
+        return redirect("/")
+
+    if not get_authorized_guild(guild_id):
+        flash("Você não tem permissão para acessar este servidor.", "error")
+        return redirect("/")
+
+    # A resposta é lida depois do fim da requisição: a conexão volta ao pool quando o servidor a fecha.
+    conn = read_pool.acquire()
+    meta = get_transcript_meta(conn, guild_id, channel_id)
+    if not meta:
+        read_pool.release(conn)
+        return "Transcrição não encontrada.", 404
+
+    response = Response(
+        iter_archive_text(iter_transcript_blob(conn, meta["rowid"])),
+        mimetype="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'inline; filename="transcript-{guild_id}-{channel_id}.txt"'},
+    )
+    response.call_on_close(lambda: read_pool.release(conn))
+    return response
+
+@app.route("/server/<int:guild_id>/search")
+def transcript_search(guild_id):
+    if "user" not in session:
+        return redirect("/")
+
+    guild = get_authorized_guild(guild_id)
+    if not guild:
+        flash("Você não tem permissão para acessar este servidor.", "error")
+        return redirect("/")
+
+    query = request.args.get("q", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    results = []
+    if query:
+        results = search_transcripts(get_db(), guild_id, query, SEARCH_PAGE_SIZE + 1, (page - 1) * SEARCH_PAGE_SIZE)
+
+    has_next = len(results) > SEARCH_PAGE_SIZE
+    guild_name = guild.get("name") or f"Servidor {guild_id}"
+
+    return render_template("search.html", guild_id=guild_id, guild_name=guild_name, query=query, page=page, results=results[:SEARCH_PAGE_SIZE], has_next=has_next)
 
 @app.route("/server/<int:guild_id>/config", methods=["POST"])
 def update_config(guild_id):
@@ -190,11 +414,96 @@ def update_config(guild_id):
           log_channel_id=excluded.log_channel_id,
           staff_role_id=excluded.staff_role_id
     """, (guild_id, log_channel_id, staff_role_id))
+    record_config_change(conn, guild_id)
     conn.commit()
     conn.close()
     
     flash("Configurações salvas com sucesso!", "success")
     return redirect(url_for("server_dashboard", guild_id=guild_id))
 
+@app.route("/server/<int:guild_id>/bulk_close", methods=["POST"])
+def bulk_close(guild_id):
+    if "user" not in session:
+        return redirect("/")
+
+    if not get_authorized_guild(guild_id):
+        flash("Você não tem permissão para fechar tickets deste servidor.", "error")
+        return redirect("/")
+
+    if request.form.get("csrf_token") != session.get("csrf_token"):
+        flash("Token CSRF inválido. Tente novamente.", "error")
+        return redirect(url_for("server_dashboard", guild_id=guild_id))
+
+    days = request.form.get("days", type=int)
+    max_tickets = request.form.get("max_tickets", type=int)
+    if days is None or days < 0 or not max_tickets or not 1 <= max_tickets <= BULK_CLOSE_MAX:
+        flash(f"Informe a idade mínima em dias e até {BULK_CLOSE_MAX} tickets.", "error")
+        return redirect(url_for("server_dashboard", guild_id=guild_id))
+
+    # O bot executa o pedido (watch_bulk_close_requests) e atualiza o progresso na mesma tabela.
+    conn = get_db_connection()
+    request_bulk_close(
+        conn,
+        guild_id,
+        int(session["user"]["id"]),
+        request.form.get("category_key") or None,
+        days * DAY,
+        request.form.get("owner_left") == "1",
+        max_tickets,
+    )
+    conn.commit()
+    conn.close()
+
+    flash("Fechamento em massa agendado; o bot começa em alguns segundos.", "success")
+    return redirect(url_for("server_dashboard", guild_id=guild_id))
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    # Sem log de acesso por requisição, como o waitress; as rotas já aparecem em /metrics.
+    def log_request(self, code="-", size="-"):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Servidor do werkzeug com um número fixo de workers (threaded=True cria uma thread por requisição)."""
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app, threads: int):
+        super().__init__(host, port, app, handler=_QuietRequestHandler)
+        self._requests: queue.SimpleQueue = queue.SimpleQueue()
+        # Threads daemon: streams SSE abertos não seguram o processo no Ctrl+C.
+        for i in range(threads):
+            threading.Thread(target=self._worker, name=f"dashboard-{i}", daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self._requests.put((request, client_address))
+
+    def _worker(self):
+        while True:
+            request, client_address = self._requests.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def run(self):
+        self.serve_forever()
+
+
+def create_server(host: str = DASHBOARD_HOST, port: int = DASHBOARD_PORT, threads: int = DASHBOARD_THREADS):
+    # Uma chamada lenta ao Discord ocupa só um dos `threads` workers; o pool de leitura tem o mesmo tamanho.
+    try:
+        import waitress
+    except ImportError:
+        return PooledWSGIServer(host, port, app, threads)
+    return waitress.create_server(app, host=host, port=port, threads=threads)
+
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    if DASHBOARD_DEBUG:
+        app.run(debug=True, host=DASHBOARD_HOST, port=DASHBOARD_PORT)
+    else:
+        server = create_server()
+        print(f"Painel em http://{DASHBOARD_HOST}:{DASHBOARD_PORT} ({type(server).__name__}, {DASHBOARD_THREADS} workers)")
+        server.run()
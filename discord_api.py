@@ -0,0 +1,201 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import DISCORD_RATE_LIMITED, DISCORD_REST_SECONDS, discord_route
+
+API_BASE_URL = "https://discord.com/api/v10"
+GUILDS_PAGE_SIZE = 200
+
+
+class DiscordRateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limit do Discord, tente novamente em {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TTLCache:
+    """Cache em memória com expiração por entrada e limite de tamanho (LRU)."""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, allow_stale: bool = False):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic() and not allow_stale:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class DiscordAPI:
+    """Cliente REST do painel: uma Session com pool de conexões, cache das
+    listas de servidores e respeito aos limites de taxa do Discord.
+
+    Antes de cada chamada o cliente espera se o bucket da rota (por token)
+    está esgotado segundo os cabeçalhos X-RateLimit-*; um 429 é repetido
+    depois do Retry-After, até `max_wait` segundos no total.
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_BASE_URL,
+        *,
+        user_ttl: float = 60.0,
+        bot_ttl: float = 300.0,
+        pool_size: int = 16,
+        timeout: float = 10.0,
+        max_wait: float = 5.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.user_guilds = TTLCache(user_ttl)
+        self.bot_guilds = TTLCache(bot_ttl, maxsize=1)
+        self.calls = 0
+        self._limits: dict[tuple, float] = {}
+        self._global_until = 0.0
+        self._lock = threading.Lock()
+        self._fetch_locks = [threading.Lock() for _ in range(32)]
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        # O token em si não fica como chave do cache.
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _wait_for(self, key: tuple) -> float:
+        with self._lock:
+            reset_at = max(self._limits.get(key, 0.0), self._global_until)
+        return max(reset_at - time.monotonic(), 0.0)
+
+    def _record_limits(self, key: tuple, response: requests.Response):
+        now = time.monotonic()
+        with self._lock:
+            if response.status_code == 429:
+                retry_after = float(response.headers.get("Retry-After", 1))
+                if response.headers.get("X-RateLimit-Global") == "true" or response.headers.get("X-RateLimit-Scope") == "global":
+                    self._global_until = now + retry_after
+                else:
+                    self._limits[key] = now + retry_after
+            elif response.headers.get("X-RateLimit-Remaining") == "0":
+                self._limits[key] = now + float(response.headers.get("X-RateLimit-Reset-After", 1))
+            else:
+                self._limits.pop(key, None)
+
+    def request(self, method: str, path: str, *, auth: str | None = None, **kwargs) -> requests.Response:
+        headers = kwargs.pop("headers", {})
+        if auth:
+            headers["Authorization"] = auth
+        key = (method, path.split("?", 1)[0], self._token_key(auth) if auth else None)
+        deadline = time.monotonic() + self.max_wait
+
+        while True:
+            wait = self._wait_for(key)
+            if wait:
+                if time.monotonic() + wait > deadline:
+                    raise DiscordRateLimited(wait)
+                time.sleep(wait)
+            with self._lock:
+                self.calls += 1
+            started = time.perf_counter()
+            response = self.session.request(
+                method, f"{self.base_url}{path}", headers=headers, timeout=self.timeout, **kwargs
+            )
+            route = discord_route(path)
+            DISCORD_REST_SECONDS.labels(method, route, response.status_code).observe(time.perf_counter() - started)
+            if response.status_code == 429:
+                DISCORD_RATE_LIMITED.labels(route, response.headers.get("X-RateLimit-Scope", "user")).inc()
+            self._record_limits(key, response)
+            if response.status_code != 429:
+                return response
+            if self._wait_for(key) + time.monotonic() > deadline:
+                raise DiscordRateLimited(self._wait_for(key))
+
+    def _cached_guilds(self, cache: TTLCache, key: str, path: str, auth: str):
+        guilds = cache.get(key)
+        if guilds is not None:
+            return guilds
+        # Requisições simultâneas com o cache vazio fazem uma única chamada ao Discord.
+        with self._fetch_locks[hash(key) % len(self._fetch_locks)]:
+            guilds = cache.get(key)
+            if guilds is not None:
+                return guilds
+            try:
+                response = self.request("GET", path, auth=auth)
+            except (DiscordRateLimited, requests.RequestException):
+                response = None
+            if response is None or response.status_code >= 500:
+                # Discord indisponível ou limitando: uma lista vencida ainda é melhor do que nenhuma.
+                return cache.get(key, allow_stale=True)
+            if response.status_code != 200:
+                # 401/403 e outros 4xx: token revogado ou inválido; nada de lista vencida, o acesso é negado.
+                cache.pop(key)
+                return None
+            guilds = response.json()
+            cache.set(key, guilds)
+            return guilds
+
+    def get_user_guilds(self, access_token: str) -> list[dict] | None:
+        return self._cached_guilds(
+            self.user_guilds, self._token_key(access_token), "/users/@me/guilds", f"Bearer {access_token}"
+        )
+
+    def get_bot_guild_ids(self, bot_token: str) -> set[str] | None:
+        """Todos os servidores do bot, paginando com `after` (200 por página)."""
+        ids = self.bot_guilds.get("bot")
+        if ids is not None:
+            return ids
+        with self._fetch_locks[hash("bot") % len(self._fetch_locks)]:
+            ids = self.bot_guilds.get("bot")
+            if ids is not None:
+                return ids
+            ids, after = set(), 0
+            try:
+                while True:
+                    response = self.request(
+                        "GET", f"/users/@me/guilds?limit={GUILDS_PAGE_SIZE}&after={after}", auth=f"Bot {bot_token}"
+                    )
+                    if response.status_code >= 500:
+                        return self.bot_guilds.get("bot", allow_stale=True)
+                    if response.status_code != 200:
+                        self.bot_guilds.pop("bot")
+                        return None
+                    page = response.json()
+                    ids.update(g["id"] for g in page)
+                    if len(page) < GUILDS_PAGE_SIZE:
+                        break
+                    after = max(int(g["id"]) for g in page)
+            except (DiscordRateLimited, requests.RequestException):
+                return self.bot_guilds.get("bot", allow_stale=True)
+            self.bot_guilds.set("bot", ids)
+            return ids
+
+    def forget_user(self, access_token: str):
+        self.user_guilds.pop(self._token_key(access_token))
+
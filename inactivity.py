@@ -0,0 +1,109 @@
+import heapq
+
+WARN = "warn"
+CLOSE = "close"
+
+
+class InactivityScheduler:
+    """Prazos de inatividade dos tickets abertos, em memória.
+
+    Uma mensagem só atualiza `last_activity` do canal (O(1), sem tocar no
+    heap nem no banco). O heap guarda no máximo uma entrada por ticket, com o
+    próximo prazo calculado quando ela foi empurrada; ao vencer, a entrada é
+    conferida com a atividade atual e reempurrada se o ticket teve mensagens
+    nesse meio tempo (invalidação preguiçosa). A memória fica em O(tickets
+    abertos) e os canais alterados desde o último `take_dirty()` são gravados
+    em lote pelo bot.
+    """
+
+    def __init__(self, close_after: int, warn_before: int):
+        self.close_after = close_after
+        self.warn_before = min(warn_before, close_after)
+        self._heap: list[tuple[int, int]] = []
+        self._guild: dict[int, int] = {}
+        self._last: dict[int, int] = {}
+        self._warned: dict[int, int] = {}
+        self._queued: set[int] = set()
+        self._dirty: set[int] = set()
+
+    def __len__(self):
+        return len(self._last)
+
+    def __contains__(self, channel_id: int):
+        return channel_id in self._last
+
+    def _deadline(self, channel_id: int) -> int:
+        last = self._last[channel_id]
+        if channel_id in self._warned:
+            # O aviso sempre dá warn_before de prazo, mesmo para tickets que já passaram do limite.
+            return max(last + self.close_after, self._warned[channel_id] + self.warn_before)
+        return last + self.close_after - self.warn_before
+
+    def _push(self, channel_id: int, deadline: int):
+        heapq.heappush(self._heap, (deadline, channel_id))
+        self._queued.add(channel_id)
+
+    def track(self, guild_id: int, channel_id: int, last_activity: int, warned_at: int = 0):
+        if not self.close_after:
+            return
+        self._guild[channel_id] = guild_id
+        self._last[channel_id] = last_activity
+        if warned_at:
+            self._warned[channel_id] = warned_at
+        else:
+            self._warned.pop(channel_id, None)
+        if channel_id not in self._queued:
+            self._push(channel_id, self._deadline(channel_id))
+
+    def touch(self, channel_id: int, ts: int):
+        if channel_id not in self._last or ts <= self._last[channel_id]:
+            return
+        self._last[channel_id] = ts
+        self._warned.pop(channel_id, None)
+        self._dirty.add(channel_id)
+
+    def forget(self, channel_id: int):
+        # A entrada do heap é descartada quando vencer.
+        self._guild.pop(channel_id, None)
+        self._last.pop(channel_id, None)
+        self._warned.pop(channel_id, None)
+        self._dirty.discard(channel_id)
+
+    def retry(self, channel_id: int, at: int):
+        """Reagenda um ticket cujo aviso/fechamento não pôde ser feito agora."""
+        if channel_id in self._last and channel_id not in self._queued:
+            self._push(channel_id, at)
+
+    def due(self, now: int) -> list[tuple[str, int, int]]:
+        """Retira os prazos vencidos: lista de (WARN|CLOSE, guild_id, channel_id).
+
+        Um ticket devolvido com CLOSE sai do heap; o chamador faz `forget`
+        quando fechar ou `retry` se não conseguir.
+        """
+        actions = []
+        while self._heap and self._heap[0][0] <= now:
+            _, channel_id = heapq.heappop(self._heap)
+            self._queued.discard(channel_id)
+            if channel_id not in self._last:
+                continue
+            deadline = self._deadline(channel_id)
+            if deadline > now:
+                self._push(channel_id, deadline)
+            elif channel_id in self._warned:
+                actions.append((CLOSE, self._guild[channel_id], channel_id))
+            else:
+                self._warned[channel_id] = now
+                self._dirty.add(channel_id)
+                self._push(channel_id, self._deadline(channel_id))
+                actions.append((WARN, self._guild[channel_id], channel_id))
+        return actions
+
+    def take_dirty(self) -> list[tuple[int, int, int, int]]:
+        """(guild_id, channel_id, last_activity, warned_at) dos canais alterados desde a última chamada."""
+        rows = [(self._guild[c], c, self._last[c], self._warned.get(c, 0)) for c in self._dirty if c in self._last]
+        self._dirty.clear()
+        return rows
+
+    def restore_dirty(self, rows):
+        # Gravação falhou: as linhas voltam a ser pendentes para a próxima tentativa.
+        self._dirty.update(channel_id for _, channel_id, _, _ in rows)
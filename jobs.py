@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import deque
+
+from metrics import JOB_QUEUE_DEPTH, JOB_RUN_SECONDS, JOB_WAIT_SECONDS
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """Fila de jobs assíncronos com um pool fixo de workers.
+
+    Os handlers de interação respondem (defer) na hora e enfileiram o trabalho
+    lento aqui; `stats()` expõe profundidade da fila e latência por tipo de job.
+    """
+
+    def __init__(self, workers: int = 8, maxsize: int = 500, window: int = 1000):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: list[asyncio.Task] = []
+        self._window = window
+        self._wait: dict[str, deque] = {}
+        self._run: dict[str, deque] = {}
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        JOB_QUEUE_DEPTH.set_function(self._queue.qsize)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, name: str, fn, *args) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((name, fn, args, fut, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise JobQueueFull(name) from None
+        return fut
+
+    async def _worker(self):
+        while True:
+            name, fn, args, fut, enqueued = await self._queue.get()
+            started = time.perf_counter()
+            self.running += 1
+            outcome = "ok"
+            try:
+                result = await fn(*args)
+            except asyncio.CancelledError:
+                fut.cancel()
+                raise
+            except Exception as e:
+                outcome = "error"
+                self.failed += 1
+                print(f"Job {name} falhou: {e!r}")
+                if not fut.done():
+                    fut.set_exception(e)
+                    # Já registrado acima; evita o aviso de "exception was never retrieved"
+                    # quando o chamador não aguarda o resultado.
+                    fut.exception()
+            else:
+                self.completed += 1
+                if not fut.done():
+                    fut.set_result(result)
+            finally:
+                self.running -= 1
+                finished = time.perf_counter()
+                self._wait.setdefault(name, deque(maxlen=self._window)).append(started - enqueued)
+                self._run.setdefault(name, deque(maxlen=self._window)).append(finished - started)
+                JOB_WAIT_SECONDS.labels(name).observe(started - enqueued)
+                JOB_RUN_SECONDS.labels(name, outcome).observe(finished - started)
+                self._queue.task_done()
+
+    @staticmethod
+    def _percentiles(samples) -> dict:
+        if not samples:
+            return {"p50": 0.0, "p99": 0.0}
+        ordered = sorted(samples)
+        return {"p50": ordered[len(ordered) // 2], "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]}
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize(),
+            "running": self.running,
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "jobs": {
+                name: {"wait": self._percentiles(self._wait[name]), "run": self._percentiles(self._run[name])}
+                for name in self._run
+            },
+        }
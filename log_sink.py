@@ -0,0 +1,164 @@
+import asyncio
+from collections import deque
+
+import discord
+
+from metrics import LOG_EVENT_FAILURES, LOG_EVENTS_DROPPED, LOG_MESSAGE_ENTRIES
+
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+class _Entry:
+    __slots__ = ("text", "embed", "files", "future")
+
+    def __init__(self, text, embed, files, future):
+        self.text = text
+        self.embed = embed
+        self.files = files
+        self.future = future
+
+
+class _ChannelBuffer:
+    __slots__ = ("channel", "entries", "task", "dropped", "full")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.entries: deque[_Entry] = deque()
+        self.task: asyncio.Task | None = None
+        self.dropped = 0
+        self.full = asyncio.Event()
+
+
+class LogSink:
+    """Fila de envio para os canais de log, uma por canal (um por servidor).
+
+    `submit` só enfileira e retorna na hora; uma task por canal junta as
+    linhas de texto e embeds pendentes em mensagens de até 2000 caracteres e
+    10 embeds e envia em sequência, então o rate limit do canal atrasa só o
+    log, nunca quem registrou o evento. A task espera `flush_interval` para
+    acumular eventos e termina quando o buffer esvazia.
+
+    Memória limitada: cada canal guarda no máximo `max_pending` entradas.
+    Cheio, descarta a entrada mais antiga sem anexos e avisa na próxima
+    mensagem quantas foram perdidas; entradas com anexos (transcrições) não
+    são descartadas em silêncio: se não houver o que descartar, a nova
+    entrada é recusada e o seu future termina com False.
+    """
+
+    def __init__(self, *, flush_interval: float = 1.0, max_pending: int = 200):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._buffers: dict[int, _ChannelBuffer] = {}
+
+    def submit(
+        self,
+        channel: discord.abc.Messageable,
+        text: str | None = None,
+        *,
+        embed: discord.Embed | None = None,
+        files: list[discord.File] | None = None,
+    ) -> asyncio.Future:
+        """Enfileira um evento; o future termina com True quando ele foi enviado (False se falhou/foi descartado)."""
+        future = asyncio.get_running_loop().create_future()
+        buf = self._buffers.get(channel.id)
+        if buf is None:
+            buf = self._buffers[channel.id] = _ChannelBuffer(channel)
+        buf.channel = channel
+
+        if len(buf.entries) >= self.max_pending and not self._drop_oldest(buf):
+            buf.dropped += 1
+            LOG_EVENTS_DROPPED.inc()
+            future.set_result(False)
+            return future
+
+        if text and len(text) > MAX_CONTENT_LENGTH:
+            text = text[: MAX_CONTENT_LENGTH - 1] + "…"
+        buf.entries.append(_Entry(text, embed, files, future))
+        if files or len(buf.entries) >= MAX_EMBEDS_PER_MESSAGE:
+            buf.full.set()
+        if buf.task is None or buf.task.done():
+            buf.task = asyncio.create_task(self._run(buf), name=f"log-sink-{channel.id}")
+        return future
+
+    def _drop_oldest(self, buf: _ChannelBuffer) -> bool:
+        for entry in buf.entries:
+            if not entry.files:
+                buf.entries.remove(entry)
+                buf.dropped += 1
+                LOG_EVENTS_DROPPED.inc()
+                entry.future.set_result(False)
+                return True
+        return False
+
+    def _take_message(self, buf: _ChannelBuffer):
+        lines: list[str] = []
+        if buf.dropped:
+            lines.append(f"⚠️ {buf.dropped} eventos de log descartados (fila cheia).")
+            buf.dropped = 0
+        content_length = len(lines[0]) if lines else 0
+        embeds: list[discord.Embed] = []
+        embed_chars = 0
+        files: list[discord.File] = []
+        taken: list[_Entry] = []
+
+        while buf.entries:
+            entry = buf.entries[0]
+            # Anexos vão numa mensagem só deles (com o texto/embed do próprio evento).
+            if entry.files and taken:
+                break
+            added = len(entry.text) + (1 if lines else 0) if entry.text else 0
+            if content_length + added > MAX_CONTENT_LENGTH and taken:
+                break
+            if entry.embed is not None and taken and (
+                len(embeds) >= MAX_EMBEDS_PER_MESSAGE or embed_chars + len(entry.embed) > MAX_EMBED_CHARS_PER_MESSAGE
+            ):
+                break
+            buf.entries.popleft()
+            taken.append(entry)
+            if entry.text:
+                lines.append(entry.text)
+                content_length += added
+            if entry.embed is not None:
+                embeds.append(entry.embed)
+                embed_chars += len(entry.embed)
+            if entry.files:
+                files = entry.files
+                break
+        return "\n".join(lines)[:MAX_CONTENT_LENGTH] or None, embeds, files, taken
+
+    async def _run(self, buf: _ChannelBuffer):
+        # Envia quando já há uma mensagem cheia (ou anexos) ou depois de flush_interval.
+        try:
+            await asyncio.wait_for(buf.full.wait(), self.flush_interval)
+        except asyncio.TimeoutError:
+            pass
+        while buf.entries or buf.dropped:
+            buf.full.clear()
+            content, embeds, files, taken = self._take_message(buf)
+            if not (content or embeds or files):
+                for entry in taken:
+                    entry.future.set_result(True)
+                continue
+            try:
+                await buf.channel.send(content=content, embeds=embeds, files=files)
+            except Exception as e:
+                LOG_EVENT_FAILURES.inc()
+                print(f"Falha ao enviar log no canal {buf.channel.id}: {e!r}")
+                ok = False
+            else:
+                ok = True
+            LOG_MESSAGE_ENTRIES.observe(len(taken))
+            for entry in taken:
+                if not entry.future.done():
+                    entry.future.set_result(ok)
+        self._buffers.pop(buf.channel.id, None)
+
+    async def flush(self, timeout: float | None = None):
+        """Envia o que está no buffer sem esperar flush_interval e espera as tasks (ex.: no desligamento)."""
+        for buf in self._buffers.values():
+            buf.full.set()
+        tasks = [buf.task for buf in self._buffers.values() if buf.task and not buf.task.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
@@ -0,0 +1,283 @@
+import asyncio
+import bisect
+import functools
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Formato de exposição de texto do Prometheus, sem dependência extra: o bot e o
+# painel registram aqui e servem `REGISTRY.render()` em /metrics.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+COUNT_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.sample_name} {metric.help}")
+            lines.append(f"# TYPE {metric.sample_name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = ""
+    suffix = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), registry: Registry = REGISTRY):
+        self.name = name
+        # HELP/TYPE usam o mesmo nome das amostras (no formato 0.0.4, contadores terminam em _total).
+        self.sample_name = name + self.suffix
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple, object] = {}
+        registry.register(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self.labels()
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    type = "counter"
+    suffix = "_total"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.sample_name}{_labels(self.labelnames, key)} {child.value}"
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            value = child.function() if child.function else child.value
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if i < len(self.counts):
+                self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+# Catálogo de métricas. Bot e painel rodam em processos separados, então cada
+# processo só expõe as séries que de fato alimenta.
+INTERACTION_SECONDS = Histogram(
+    "ticket_interaction_seconds", "Tempo até responder uma interação (abrir, fechar, verificar).", ("action",)
+)
+JOB_WAIT_SECONDS = Histogram("ticket_job_wait_seconds", "Tempo de um job na fila até um worker pegá-lo.", ("job",))
+JOB_RUN_SECONDS = Histogram("ticket_job_run_seconds", "Duração de um job da fila.", ("job", "outcome"))
+JOB_QUEUE_DEPTH = Gauge("ticket_job_queue_depth", "Jobs aguardando na fila.")
+STORAGE_QUERY_SECONDS = Histogram("storage_query_seconds", "Latência de cada helper do SQLite.", ("kind", "query"))
+STORAGE_COMMIT_SECONDS = Histogram("storage_commit_seconds", "Duração de um lote do group commit (BEGIN até COMMIT).")
+STORAGE_BATCH_SIZE = Histogram("storage_batch_size", "Operações por lote do group commit.", buckets=COUNT_BUCKETS)
+TRANSCRIPT_FETCH_SECONDS = Histogram("transcript_fetch_seconds", "Tempo para ler o histórico do canal no fechamento.")
+TRANSCRIPT_BYTES = Histogram("transcript_bytes", "Tamanho da transcrição em texto.", buckets=SIZE_BUCKETS)
+TRANSCRIPT_MESSAGES = Histogram("transcript_messages", "Mensagens por transcrição.", buckets=COUNT_BUCKETS)
+DISCORD_REST_SECONDS = Histogram("discord_rest_seconds", "Latência das chamadas REST ao Discord.", ("method", "route", "status"))
+DISCORD_RATE_LIMITED = Counter("discord_rate_limited", "Respostas 429 do Discord.", ("route", "scope"))
+EVENT_LOOP_LAG_SECONDS = Histogram("event_loop_lag_seconds", "Atraso do event loop em relação ao agendado.")
+LOG_EVENT_FAILURES = Counter("log_event_failures", "Falhas ao enviar mensagens ao canal de logs.")
+LOG_EVENTS_DROPPED = Counter("log_events_dropped", "Eventos de log descartados porque a fila do canal estava cheia.")
+LOG_MESSAGE_ENTRIES = Histogram("log_message_entries", "Eventos agrupados em cada mensagem enviada ao canal de logs.", buckets=(1, 2, 5, 10, 20, 50))
+DASHBOARD_REQUEST_SECONDS = Histogram(
+    "dashboard_request_seconds", "Tempo de resposta do painel por rota.", ("method", "endpoint", "status")
+)
+
+
+def timed(child):
+    """Decorador para corrotinas: registra a duração de cada chamada em `child` (um histograma já rotulado)."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - t0)
+
+        return wrapper
+
+    return decorator
+
+
+_SNOWFLAKE = re.compile(r"/\d{15,21}(?=/|$)")
+
+
+def discord_route(path: str) -> str:
+    """/channels/123.../messages → /channels/:id/messages, para não criar uma série por ID."""
+    return _SNOWFLAKE.sub("/:id", path.split("?", 1)[0])
+
+
+async def watch_event_loop_lag(interval: float = 0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - expected, 0.0))
+
+
+def discord_trace_config():
+    """TraceConfig do aiohttp para o cliente HTTP do discord.py (Client(http_trace=...))."""
+    import aiohttp
+
+    async def on_request_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        route = discord_route(params.url.path)
+        status = params.response.status
+        DISCORD_REST_SECONDS.labels(params.method, route, status).observe(time.perf_counter() - ctx.started)
+        if status == 429:
+            scope = params.response.headers.get("X-RateLimit-Scope", "user")
+            DISCORD_RATE_LIMITED.labels(route, scope).inc()
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+
+async def start_metrics_server(host: str, port: int, registry: Registry = REGISTRY):
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
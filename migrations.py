@@ -0,0 +1,287 @@
+import sqlite3
+
+# Cada migração é (versão, descrição, comandos). A versão aplicada fica em
+# PRAGMA user_version; nunca edite uma migração já publicada, crie a próxima.
+MIGRATIONS = (
+    (
+        1,
+        "esquema inicial",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS guild_config (
+                guild_id INTEGER PRIMARY KEY,
+                panel_channel_id INTEGER,
+                log_channel_id INTEGER,
+                staff_role_id INTEGER
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS categories (
+                guild_id INTEGER,
+                key TEXT,
+                category_id INTEGER,
+                name TEXT,
+                PRIMARY KEY (guild_id, key)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS tickets (
+                guild_id INTEGER,
+                user_id INTEGER,
+                category_key TEXT,
+                channel_id INTEGER,
+                created_at TEXT,
+                PRIMARY KEY (guild_id, user_id, category_key)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_tickets_guild_created ON tickets (guild_id, created_at)",
+            """
+            CREATE TABLE IF NOT EXISTS ticket_categories (
+                guild_id INTEGER,
+                key TEXT,
+                label TEXT NOT NULL,
+                description TEXT,
+                category_name TEXT NOT NULL,
+                embed_title TEXT NOT NULL,
+                channel_prefix TEXT NOT NULL,
+                position INTEGER DEFAULT 0,
+                button INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, key)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS transcripts (
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                closed_at TEXT,
+                messages INTEGER,
+                raw_size INTEGER,
+                codec TEXT,
+                data BLOB,
+                PRIMARY KEY (guild_id, channel_id)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_transcripts_guild_closed ON transcripts (guild_id, closed_at)",
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS transcript_fts USING fts5(
+                guild_id,
+                channel_id UNINDEXED,
+                content,
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS config_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                changed_at TEXT
+            )
+            """,
+        ),
+    ),
+    (
+        2,
+        "índices do caminho de fechamento, histórico e timestamps",
+        (
+            "CREATE INDEX IF NOT EXISTS idx_tickets_guild_channel ON tickets (guild_id, channel_id)",
+            "CREATE INDEX IF NOT EXISTS idx_tickets_guild_category ON tickets (guild_id, category_key)",
+            "ALTER TABLE tickets ADD COLUMN opened_at INTEGER",
+            "UPDATE tickets SET opened_at = CAST(strftime('%s', created_at) AS INTEGER) WHERE created_at IS NOT NULL",
+            """
+            CREATE TABLE IF NOT EXISTS ticket_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                category_key TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                opened_at INTEGER,
+                closed_at INTEGER NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_ticket_history_guild_closed ON ticket_history (guild_id, closed_at)",
+        ),
+    ),
+    (
+        3,
+        "dados de fechamento e agregados por hora/dia",
+        (
+            "ALTER TABLE ticket_history ADD COLUMN closed_by INTEGER",
+            "ALTER TABLE ticket_history ADD COLUMN duration INTEGER",
+            "ALTER TABLE ticket_history ADD COLUMN message_count INTEGER",
+            # period é 3600 (hora) ou 86400 (dia); bucket é o início do período em epoch.
+            """
+            CREATE TABLE IF NOT EXISTS ticket_rollups (
+                guild_id INTEGER NOT NULL,
+                period INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                opened INTEGER NOT NULL DEFAULT 0,
+                closed INTEGER NOT NULL DEFAULT 0,
+                duration_total INTEGER NOT NULL DEFAULT 0,
+                messages INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, period, bucket)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS ticket_duration_bins (
+                guild_id INTEGER NOT NULL,
+                period INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                bin INTEGER NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, period, bucket, bin)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS ticket_staff_rollups (
+                guild_id INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                staff_id INTEGER NOT NULL,
+                closed INTEGER NOT NULL DEFAULT 0,
+                duration_total INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, bucket, staff_id)
+            ) WITHOUT ROWID
+            """,
+            # Aberturas e fechamentos já conhecidos entram nos agregados; a duração
+            # dos fechamentos anteriores a esta versão não foi registrada.
+            """
+            INSERT INTO ticket_rollups (guild_id, period, bucket, opened)
+            SELECT guild_id, period, opened_at - opened_at % period, COUNT(*)
+            FROM (SELECT guild_id, opened_at FROM tickets UNION ALL SELECT guild_id, opened_at FROM ticket_history),
+                 (SELECT 3600 AS period UNION ALL SELECT 86400)
+            WHERE opened_at IS NOT NULL
+            GROUP BY 1, 2, 3
+            """,
+            """
+            INSERT INTO ticket_rollups (guild_id, period, bucket, closed)
+            SELECT guild_id, period, closed_at - closed_at % period, COUNT(*)
+            FROM ticket_history, (SELECT 3600 AS period UNION ALL SELECT 86400)
+            WHERE true
+            GROUP BY 1, 2, 3
+            ON CONFLICT (guild_id, period, bucket) DO UPDATE SET closed = excluded.closed
+            """,
+        ),
+    ),
+    (
+        4,
+        "servidores em que o bot está",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS bot_guilds (
+                guild_id INTEGER PRIMARY KEY,
+                shard_id INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_bot_guilds_shard ON bot_guilds (shard_id)",
+            """
+            CREATE TABLE IF NOT EXISTS bot_shards (
+                shard_id INTEGER PRIMARY KEY,
+                guild_count INTEGER NOT NULL DEFAULT 0,
+                heartbeat_at INTEGER NOT NULL
+            )
+            """,
+        ),
+    ),
+    (
+        5,
+        "métricas por shard",
+        (
+            "ALTER TABLE bot_shards ADD COLUMN shard_count INTEGER",
+            "ALTER TABLE bot_shards ADD COLUMN pid INTEGER",
+            "ALTER TABLE bot_shards ADD COLUMN latency_ms REAL",
+            "ALTER TABLE bot_shards ADD COLUMN events_per_min REAL",
+        ),
+    ),
+    (
+        6,
+        "fechamento de tickets em massa",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS bulk_close_requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                requested_by INTEGER NOT NULL,
+                category_key TEXT,
+                min_age INTEGER NOT NULL DEFAULT 0,
+                owner_left INTEGER NOT NULL DEFAULT 0,
+                max_tickets INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                matched INTEGER NOT NULL DEFAULT 0,
+                closed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                created_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_bulk_close_status ON bulk_close_requests (status, updated_at)",
+            "CREATE INDEX IF NOT EXISTS idx_bulk_close_guild ON bulk_close_requests (guild_id, id)",
+        ),
+    ),
+    (
+        7,
+        "atividade dos tickets para o fechamento por inatividade",
+        (
+            "ALTER TABLE tickets ADD COLUMN last_activity INTEGER",
+            # Momento (epoch) do aviso de inatividade; 0 = sem aviso desde a última mensagem.
+            "ALTER TABLE tickets ADD COLUMN inactivity_warned INTEGER NOT NULL DEFAULT 0",
+            "UPDATE tickets SET last_activity = opened_at",
+        ),
+    ),
+    (
+        8,
+        "registro de mudanças dos tickets para o painel ao vivo",
+        (
+            # AUTOINCREMENT: IDs nunca são reaproveitados depois da limpeza, então servem de cursor (Last-Event-ID).
+            """
+            CREATE TABLE IF NOT EXISTS ticket_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                user_id INTEGER,
+                category_key TEXT,
+                closed_by INTEGER,
+                at INTEGER NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_ticket_events_guild ON ticket_events (guild_id, id)",
+        ),
+    ),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: int | None = None) -> int:
+    """Aplica as migrações pendentes até `target` (padrão: a mais recente).
+
+    Cada migração roda na sua própria transação BEGIN IMMEDIATE e a versão é
+    relida já com o lock de escrita, então o bot e o painel podem migrar o
+    mesmo banco ao mesmo tempo sem aplicar nada duas vezes.
+    """
+    target = LATEST_VERSION if target is None else target
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for version, description, statements in MIGRATIONS:
+            if version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if get_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                for stmt in statements:
+                    conn.execute(stmt)
+                conn.execute(f"PRAGMA user_version = {version:d}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            print(f"Migração {version} aplicada: {description}")
+        return get_version(conn)
+    finally:
+        conn.isolation_level = isolation_level
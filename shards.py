@@ -0,0 +1,112 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def parse_shard_ids(spec: str) -> list[int] | None:
+    """Converte "0-3,8" em [0, 1, 2, 3, 8]; string vazia vira None (todos os shards)."""
+    spec = spec.strip()
+    if not spec:
+        return None
+    ids: set[int] = set()
+    for part in spec.split(","):
+        start, _, end = part.strip().partition("-")
+        ids.update(range(int(start), int(end or start) + 1))
+    return sorted(ids)
+
+
+def format_shard_ids(ids: list[int]) -> str:
+    return f"{ids[0]}-{ids[-1]}" if len(ids) > 1 else str(ids[0])
+
+
+def split_shards(shard_count: int, processes: int) -> list[list[int]]:
+    # Faixas contíguas e o mais iguais possível: 10 shards em 3 processos → 0-3, 4-6, 7-9.
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def recommended_shard_count(token: str) -> int:
+    response = requests.get(GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}"}, timeout=10)
+    response.raise_for_status()
+    return int(response.json()["shards"])
+
+
+def run_processes(script: str, shard_count: int, processes: int) -> int:
+    """Sobe um processo do bot por faixa de shards e espera.
+
+    Cada filho recebe SHARD_COUNT/SHARD_IDS pelo ambiente. Se um deles cair,
+    os outros são encerrados e o código de saída é repassado, para que o
+    supervisor (systemd, docker...) reinicie o conjunto inteiro.
+    """
+    children = []
+    metrics_port = int(os.getenv("METRICS_PORT", "0") or 0)
+    for i, ids in enumerate(split_shards(shard_count, processes)):
+        env = dict(os.environ, SHARD_COUNT=str(shard_count), SHARD_IDS=format_shard_ids(ids))
+        if metrics_port:
+            # Um /metrics por processo: METRICS_PORT, METRICS_PORT+1, ...
+            env["METRICS_PORT"] = str(metrics_port + i)
+        print(f"Iniciando processo para os shards {format_shard_ids(ids)} de {shard_count}")
+        children.append(subprocess.Popen([sys.executable, script], env=env))
+
+    def stop(*_):
+        for child in children:
+            if child.poll() is None:
+                child.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while True:
+            for child in children:
+                code = child.poll()
+                if code is not None:
+                    stop()
+                    for other in children:
+                        other.wait()
+                    return code
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop()
+        for child in children:
+            child.wait()
+        return 0
+
+
+class ShardMetrics:
+    """Contadores de eventos por shard; a taxa é calculada entre dois `snapshot()`."""
+
+    def __init__(self):
+        self.events: dict[int, int] = {}
+        self.gateway_events = 0
+        self._last: dict[int, int] = {}
+        self._last_gateway = 0
+        self._last_at = time.monotonic()
+
+    def record(self, shard_id: int | None):
+        shard_id = shard_id or 0
+        self.events[shard_id] = self.events.get(shard_id, 0) + 1
+
+    def record_gateway(self):
+        self.gateway_events += 1
+
+    def snapshot(self) -> tuple[dict[int, float], float]:
+        """Eventos por minuto de cada shard e do gateway (processo inteiro) desde o último snapshot."""
+        now = time.monotonic()
+        minutes = max(now - self._last_at, 1e-6) / 60
+        rates = {shard_id: (count - self._last.get(shard_id, 0)) / minutes for shard_id, count in self.events.items()}
+        gateway_rate = (self.gateway_events - self._last_gateway) / minutes
+        self._last = dict(self.events)
+        self._last_gateway = self.gateway_events
+        self._last_at = now
+        return rates, gateway_rate
@@ -0,0 +1,126 @@
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from storage import DAY, HOUR, bin_duration, get_ticket_categories
+
+RECENT_TICKETS_PAGE_SIZE = 20
+
+
+def get_guild_stats(conn: sqlite3.Connection, guild_id: int) -> dict:
+    # Um único GROUP BY por idx_tickets_guild_category em vez de um COUNT por categoria.
+    counts = dict(
+        conn.execute(
+            "SELECT category_key, COUNT(*) FROM tickets WHERE guild_id=? GROUP BY category_key", (guild_id,)
+        ).fetchall()
+    )
+
+    # Categorias vêm do registro do servidor; chaves antigas que só existem em tickets também aparecem.
+    labels = {c["key"]: c["label"] for c in get_ticket_categories(conn, guild_id)}
+    for key in counts:
+        labels.setdefault(key, key)
+
+    open_tickets = sum(counts.values())
+    closed_tickets = conn.execute(
+        "SELECT COALESCE(SUM(closed), 0) FROM ticket_rollups WHERE guild_id=? AND period=?", (guild_id, DAY)
+    ).fetchone()[0]
+    return {
+        "open_tickets": open_tickets,
+        "total_tickets": open_tickets + closed_tickets,
+        "categories": [{"key": key, "label": label, "count": counts.get(key, 0)} for key, label in labels.items()],
+    }
+
+
+def get_recent_tickets(conn: sqlite3.Connection, guild_id: int, page: int = 1, page_size: int = RECENT_TICKETS_PAGE_SIZE):
+    # Usa idx_tickets_guild_created: lê só as linhas da página, sem ordenar a tabela inteira.
+    rows = conn.execute(
+        """
+        SELECT user_id, category_key, channel_id, created_at FROM tickets
+        WHERE guild_id=? ORDER BY created_at DESC LIMIT ? OFFSET ?
+        """,
+        (guild_id, page_size + 1, (page - 1) * page_size),
+    ).fetchall()
+    return rows[:page_size], len(rows) > page_size
+
+
+def get_recent_transcripts(conn: sqlite3.Connection, guild_id: int, limit: int = 20):
+    return conn.execute(
+        """
+        SELECT channel_id, closed_at, messages, raw_size, length(data) AS size FROM transcripts
+        WHERE guild_id=? ORDER BY closed_at DESC LIMIT ?
+        """,
+        (guild_id, limit),
+    ).fetchall()
+
+
+def _median_from_bins(bins: dict[int, int]) -> float | None:
+    total = sum(bins.values())
+    if not total:
+        return None
+    seen = 0
+    for b in sorted(bins):
+        seen += bins[b]
+        if seen * 2 >= total:
+            return bin_duration(b)
+    return None
+
+
+def get_ticket_timeseries(conn: sqlite3.Connection, guild_id: int, period: int = DAY, buckets: int = 30, now: int | None = None) -> dict:
+    # Lê só os agregados (ticket_rollups/ticket_duration_bins), nunca o histórico bruto.
+    now = int(time.time()) if now is None else now
+    last = now - now % period
+    first = last - (buckets - 1) * period
+
+    rollups = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            """
+            SELECT bucket, opened, closed, messages FROM ticket_rollups
+            WHERE guild_id=? AND period=? AND bucket>=?
+            """,
+            (guild_id, period, first),
+        )
+    }
+    bins: dict[int, dict[int, int]] = {}
+    overall: dict[int, int] = {}
+    for bucket, b, count in conn.execute(
+        "SELECT bucket, bin, count FROM ticket_duration_bins WHERE guild_id=? AND period=? AND bucket>=?",
+        (guild_id, period, first),
+    ):
+        bins.setdefault(bucket, {})[b] = count
+        overall[b] = overall.get(b, 0) + count
+
+    # O backlog atual é exato; os anteriores saem de desfazer aberturas/fechamentos de trás para frente.
+    backlog = conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=?", (guild_id,)).fetchone()[0]
+    label_format = "%d/%m %Hh" if period == HOUR else "%d/%m"
+    points = []
+    for bucket in range(last, first - 1, -period):
+        opened, closed, messages = rollups.get(bucket, (0, 0, 0))
+        points.append(
+            {
+                "bucket": bucket,
+                "label": datetime.fromtimestamp(bucket, timezone.utc).strftime(label_format),
+                "opened": opened,
+                "closed": closed,
+                "backlog": backlog,
+                "median_duration": _median_from_bins(bins.get(bucket, {})),
+                "avg_messages": messages / closed if closed else None,
+            }
+        )
+        backlog -= opened - closed
+    points.reverse()
+    return {"points": points, "median_duration": _median_from_bins(overall)}
+
+
+def get_staff_stats(conn: sqlite3.Connection, guild_id: int, days: int = 30, limit: int = 20, now: int | None = None) -> list[dict]:
+    now = int(time.time()) if now is None else now
+    since = now - now % DAY - (days - 1) * DAY
+    rows = conn.execute(
+        """
+        SELECT staff_id, SUM(closed), SUM(duration_total) FROM ticket_staff_rollups
+        WHERE guild_id=? AND bucket>=?
+        GROUP BY staff_id ORDER BY 2 DESC LIMIT ?
+        """,
+        (guild_id, since, limit),
+    ).fetchall()
+    return [{"staff_id": staff_id, "closed": closed, "avg_duration": total / closed} for staff_id, closed, total in rows]
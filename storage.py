@@ -0,0 +1,862 @@
+import asyncio
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from metrics import STORAGE_BATCH_SIZE, STORAGE_COMMIT_SECONDS, STORAGE_QUERY_SECONDS
+from migrations import migrate
+
+TRANSCRIPT_CHUNK_SIZE = 64 * 1024
+FTS_ROW_SIZE = 16 * 1024
+# Vários processos (um por faixa de shards) e o painel disputam o lock de escrita do mesmo arquivo.
+BUSY_TIMEOUT_MS = 15000
+HOUR = 3600
+DAY = 86400
+ROLLUP_PERIODS = (HOUR, DAY)
+# Bins logarítmicos de duração: 4 por oitava, ~9% de erro na mediana estimada.
+DURATION_BINS_PER_OCTAVE = 4
+# O bot renova o heartbeat do seu conjunto de servidores a cada minuto; acima disso o painel não confia nele.
+BOT_GUILDS_MAX_AGE = 180
+# Mudanças de tickets guardadas para o painel ao vivo; um painel mais atrasado que isso recarrega a página.
+TICKET_EVENTS_KEEP = 10_000
+TICKET_EVENT_FIELDS = ("id", "kind", "channel_id", "user_id", "category_key", "closed_by", "at")
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS:d}")
+    return conn
+
+
+# Consultas síncronas: rodam sempre numa thread do Storage, nunca no event loop.
+
+def _get_guild_config(conn: sqlite3.Connection, guild_id: int):
+    row = conn.execute(
+        "SELECT panel_channel_id, log_channel_id, staff_role_id FROM guild_config WHERE guild_id=?",
+        (guild_id,),
+    ).fetchone()
+    if not row:
+        return {"panel_channel_id": None, "log_channel_id": None, "staff_role_id": None}
+    return {"panel_channel_id": row[0], "log_channel_id": row[1], "staff_role_id": row[2]}
+
+
+def _upsert_guild_config(conn: sqlite3.Connection, guild_id: int, panel_channel_id, log_channel_id, staff_role_id):
+    conn.execute(
+        """
+        INSERT INTO guild_config (guild_id, panel_channel_id, log_channel_id, staff_role_id)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(guild_id) DO UPDATE SET
+          panel_channel_id=COALESCE(excluded.panel_channel_id, panel_channel_id),
+          log_channel_id=COALESCE(excluded.log_channel_id, log_channel_id),
+          staff_role_id=COALESCE(excluded.staff_role_id, staff_role_id)
+        """,
+        (guild_id, panel_channel_id, log_channel_id, staff_role_id),
+    )
+
+
+def _set_category(conn: sqlite3.Connection, guild_id: int, key: str, category_id: int, name: str):
+    conn.execute(
+        """
+        INSERT INTO categories (guild_id, key, category_id, name)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(guild_id, key) DO UPDATE SET
+          category_id=excluded.category_id,
+          name=excluded.name
+        """,
+        (guild_id, key, category_id, name),
+    )
+
+
+def _get_category_id(conn: sqlite3.Connection, guild_id: int, key: str):
+    row = conn.execute(
+        "SELECT category_id, name FROM categories WHERE guild_id=? AND key=?", (guild_id, key)
+    ).fetchone()
+    if not row:
+        return None, None
+    return row[0], row[1]
+
+
+def _delete_category(conn: sqlite3.Connection, guild_id: int, key: str):
+    conn.execute("DELETE FROM categories WHERE guild_id=? AND key=?", (guild_id, key))
+
+
+def _get_all_guild_configs(conn: sqlite3.Connection):
+    rows = conn.execute("SELECT guild_id, panel_channel_id, log_channel_id, staff_role_id FROM guild_config")
+    return {
+        row[0]: {"panel_channel_id": row[1], "log_channel_id": row[2], "staff_role_id": row[3]}
+        for row in rows
+    }
+
+
+def _get_all_categories(conn: sqlite3.Connection):
+    rows = conn.execute("SELECT guild_id, key, category_id, name FROM categories")
+    return {(row[0], row[1]): (row[2], row[3]) for row in rows}
+
+
+TICKET_CATEGORY_FIELDS = ("key", "label", "description", "category_name", "embed_title", "channel_prefix", "position", "button")
+
+
+def get_ticket_categories(conn: sqlite3.Connection, guild_id: int) -> list[dict]:
+    rows = conn.execute(
+        f"SELECT {', '.join(TICKET_CATEGORY_FIELDS)} FROM ticket_categories WHERE guild_id=? ORDER BY position, key",
+        (guild_id,),
+    ).fetchall()
+    return [dict(zip(TICKET_CATEGORY_FIELDS, row)) for row in rows]
+
+
+def _get_all_ticket_categories(conn: sqlite3.Connection) -> dict[int, list[dict]]:
+    rows = conn.execute(
+        f"SELECT guild_id, {', '.join(TICKET_CATEGORY_FIELDS)} FROM ticket_categories ORDER BY guild_id, position, key"
+    )
+    registry: dict[int, list[dict]] = {}
+    for row in rows:
+        registry.setdefault(row[0], []).append(dict(zip(TICKET_CATEGORY_FIELDS, row[1:])))
+    return registry
+
+
+def _upsert_ticket_categories(conn: sqlite3.Connection, guild_id: int, categories: list[dict], replace: bool = True):
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    conn.executemany(
+        f"""
+        {verb} INTO ticket_categories (guild_id, {', '.join(TICKET_CATEGORY_FIELDS)})
+        VALUES (?, {', '.join('?' for _ in TICKET_CATEGORY_FIELDS)})
+        """,
+        [(guild_id, *(c.get(f) for f in TICKET_CATEGORY_FIELDS)) for c in categories],
+    )
+
+
+def _delete_ticket_category(conn: sqlite3.Connection, guild_id: int, key: str):
+    conn.execute("DELETE FROM ticket_categories WHERE guild_id=? AND key=?", (guild_id, key))
+
+
+def record_config_change(conn: sqlite3.Connection, guild_id: int):
+    conn.execute(
+        "INSERT INTO config_changes (guild_id, changed_at) VALUES (?, ?)",
+        (guild_id, datetime.now(timezone.utc).isoformat()),
+    )
+
+
+def _get_last_config_change(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM config_changes").fetchone()[0]
+
+
+def _get_config_changes(conn: sqlite3.Connection, since_id: int):
+    return conn.execute(
+        "SELECT id, guild_id FROM config_changes WHERE id > ? ORDER BY id", (since_id,)
+    ).fetchall()
+
+
+def _save_transcript(
+    conn: sqlite3.Connection, guild_id: int, channel_id: int, codec: str, messages: int, raw_size: int, fp, size: int
+):
+    # O blob é reservado com zeroblob e preenchido em blocos, sem montar os bytes inteiros em memória.
+    cur = conn.execute(
+        """
+        INSERT OR REPLACE INTO transcripts (guild_id, channel_id, closed_at, messages, raw_size, codec, data)
+        VALUES (?, ?, ?, ?, ?, ?, zeroblob(?))
+        """,
+        (guild_id, channel_id, datetime.now(timezone.utc).isoformat(), messages, raw_size, codec, size),
+    )
+    with conn.blobopen("transcripts", "data", cur.lastrowid) as blob:
+        while chunk := fp.read(TRANSCRIPT_CHUNK_SIZE):
+            blob.write(chunk)
+
+
+def get_transcript_meta(conn: sqlite3.Connection, guild_id: int, channel_id: int):
+    row = conn.execute(
+        """
+        SELECT rowid, closed_at, messages, raw_size, codec, length(data) FROM transcripts
+        WHERE guild_id=? AND channel_id=?
+        """,
+        (guild_id, channel_id),
+    ).fetchone()
+    if not row:
+        return None
+    return {
+        "rowid": row[0],
+        "closed_at": row[1],
+        "messages": row[2],
+        "raw_size": row[3],
+        "codec": row[4],
+        "size": row[5],
+    }
+
+
+def iter_transcript_blob(conn: sqlite3.Connection, rowid: int):
+    with conn.blobopen("transcripts", "data", rowid, readonly=True) as blob:
+        while chunk := blob.read(TRANSCRIPT_CHUNK_SIZE):
+            yield chunk
+
+
+def _utf8_boundary(data: bytes, size: int) -> int:
+    while 0 < size < len(data) and data[size] & 0xC0 == 0x80:
+        size -= 1
+    return size
+
+
+def _index_transcript(conn: sqlite3.Connection, guild_id: int, channel_id: int, parts):
+    # Lê as partes já gravadas em disco e indexa em linhas de ~16 KiB (cortadas em fim de linha).
+    conn.execute(
+        "DELETE FROM transcript_fts WHERE transcript_fts MATCH ? AND channel_id=?",
+        (f'guild_id : "{guild_id}"', channel_id),
+    )
+    rows, pending = [], b""
+    for part in parts:
+        part.seek(0)
+        while chunk := part.read(FTS_ROW_SIZE):
+            pending += chunk
+            while len(pending) > FTS_ROW_SIZE:
+                newline = pending.rfind(b"\n", 0, FTS_ROW_SIZE)
+                # Uma linha maior que a linha do índice é cortada no limite de um caractere UTF-8.
+                cut = newline + 1 if newline >= 0 else _utf8_boundary(pending, FTS_ROW_SIZE)
+                rows.append((str(guild_id), channel_id, pending[:cut].decode("utf-8")))
+                pending = pending[cut:]
+        part.seek(0)
+    if pending:
+        rows.append((str(guild_id), channel_id, pending.decode("utf-8")))
+    conn.executemany("INSERT INTO transcript_fts (guild_id, channel_id, content) VALUES (?, ?, ?)", rows)
+
+
+def fts_query(guild_id: int, text: str) -> str | None:
+    # Cada termo do usuário vira uma frase entre aspas: nenhum operador FTS5 vem da entrada.
+    terms = [f'"{t.replace(chr(34), chr(34) * 2)}"' for t in text.split()]
+    if not terms:
+        return None
+    return f'guild_id : "{guild_id}" AND content : ({" ".join(terms)})'
+
+
+def search_transcripts(conn: sqlite3.Connection, guild_id: int, text: str, limit: int = 20, offset: int = 0):
+    query = fts_query(guild_id, text)
+    if query is None:
+        return []
+    rows = conn.execute(
+        """
+        WITH hits AS MATERIALIZED (
+            SELECT rowid, channel_id, bm25(transcript_fts, 0.0, 0.0, 1.0) AS score
+            FROM transcript_fts WHERE transcript_fts MATCH ?
+        )
+        SELECT channel_id, MIN(score) AS score, rowid FROM hits
+        GROUP BY channel_id ORDER BY score LIMIT ? OFFSET ?
+        """,
+        (query, limit, offset),
+    ).fetchall()
+    results = []
+    for channel_id, score, rowid in rows:
+        snippet = conn.execute(
+            "SELECT snippet(transcript_fts, 2, '[', ']', '…', 16) FROM transcript_fts WHERE transcript_fts MATCH ? AND rowid=?",
+            (query, rowid),
+        ).fetchone()
+        meta = conn.execute(
+            "SELECT closed_at, messages FROM transcripts WHERE guild_id=? AND channel_id=?", (guild_id, channel_id)
+        ).fetchone()
+        results.append(
+            {
+                "channel_id": channel_id,
+                "score": -score,
+                "snippet": snippet[0] if snippet else "",
+                "closed_at": meta[0] if meta else None,
+                "messages": meta[1] if meta else None,
+            }
+        )
+    return results
+
+
+def _has_open_ticket(conn: sqlite3.Connection, guild_id: int, user_id: int, category_key: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM tickets WHERE guild_id=? AND user_id=? AND category_key=?",
+        (guild_id, user_id, category_key),
+    ).fetchone()
+    return row is not None
+
+
+def _save_ticket(conn: sqlite3.Connection, guild_id: int, user_id: int, category_key: str, channel_id: int):
+    now = datetime.now(timezone.utc)
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO tickets (guild_id, user_id, category_key, channel_id, created_at, opened_at, last_activity)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (guild_id, user_id, category_key, channel_id, now.isoformat(), int(now.timestamp()), int(now.timestamp())),
+    )
+    _record_ticket_event(conn, guild_id, "open", channel_id, user_id, category_key, None, int(now.timestamp()))
+    _add_to_rollups(conn, guild_id, int(now.timestamp()), opened=1)
+
+
+def _delete_ticket_by_channel(
+    conn: sqlite3.Connection, guild_id: int, channel_id: int, closed_by: int | None = None, message_count: int | None = None
+):
+    # Move o ticket para ticket_history e atualiza os agregados na mesma transação.
+    row = conn.execute(
+        "SELECT user_id, category_key, opened_at FROM tickets WHERE guild_id=? AND channel_id=?",
+        (guild_id, channel_id),
+    ).fetchone()
+    if not row:
+        return
+    user_id, category_key, opened_at = row
+    closed_at = int(time.time())
+    duration = max(closed_at - opened_at, 0) if opened_at is not None else None
+    conn.execute(
+        """
+        INSERT INTO ticket_history
+            (guild_id, user_id, category_key, channel_id, opened_at, closed_at, closed_by, duration, message_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (guild_id, user_id, category_key, channel_id, opened_at, closed_at, closed_by, duration, message_count),
+    )
+    conn.execute("DELETE FROM tickets WHERE guild_id=? AND channel_id=?", (guild_id, channel_id))
+    _record_ticket_event(conn, guild_id, "close", channel_id, user_id, category_key, closed_by, closed_at)
+    _add_to_rollups(conn, guild_id, closed_at, closed=1, duration=duration, messages=message_count or 0)
+    if closed_by is not None:
+        day = closed_at - closed_at % DAY
+        conn.execute(
+            """
+            INSERT INTO ticket_staff_rollups (guild_id, bucket, staff_id, closed, duration_total) VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (guild_id, bucket, staff_id) DO UPDATE SET
+              closed = closed + 1,
+              duration_total = duration_total + excluded.duration_total
+            """,
+            (guild_id, day, closed_by, duration or 0),
+        )
+
+
+def _record_ticket_event(
+    conn: sqlite3.Connection, guild_id: int, kind: str, channel_id: int, user_id: int, category_key: str, closed_by, at: int
+):
+    # Mesma transação da mudança; cada inserção apaga no máximo o evento mais antigo além de TICKET_EVENTS_KEEP.
+    event_id = conn.execute(
+        """
+        INSERT INTO ticket_events (guild_id, kind, channel_id, user_id, category_key, closed_by, at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (guild_id, kind, channel_id, user_id, category_key, closed_by, at),
+    ).lastrowid
+    conn.execute("DELETE FROM ticket_events WHERE id <= ?", (event_id - TICKET_EVENTS_KEEP,))
+
+
+def get_ticket_event_bounds(conn: sqlite3.Connection) -> tuple[int, int]:
+    """(primeiro, último) ID guardado em ticket_events; (0, 0) se vazia."""
+    first, last = conn.execute("SELECT MIN(id), MAX(id) FROM ticket_events").fetchone()
+    return first or 0, last or 0
+
+
+def get_ticket_events(conn: sqlite3.Connection, guild_id: int, since_id: int, limit: int = 100) -> list[dict]:
+    # idx_ticket_events_guild: custo proporcional às mudanças novas, não ao número de tickets.
+    rows = conn.execute(
+        f"""
+        SELECT {', '.join(TICKET_EVENT_FIELDS)} FROM ticket_events
+        WHERE guild_id=? AND id > ? ORDER BY id LIMIT ?
+        """,
+        (guild_id, since_id, limit),
+    ).fetchall()
+    return [dict(zip(TICKET_EVENT_FIELDS, row)) for row in rows]
+
+
+def duration_bin(duration: int) -> int:
+    return int(math.log2(duration + 1) * DURATION_BINS_PER_OCTAVE)
+
+
+def bin_duration(b: int) -> float:
+    # Ponto médio (geométrico) do intervalo de durações coberto pelo bin.
+    return 2 ** ((b + 0.5) / DURATION_BINS_PER_OCTAVE) - 1
+
+
+def _add_to_rollups(
+    conn: sqlite3.Connection, guild_id: int, ts: int, opened: int = 0, closed: int = 0, duration: int | None = None, messages: int = 0
+):
+    for period in ROLLUP_PERIODS:
+        bucket = ts - ts % period
+        conn.execute(
+            """
+            INSERT INTO ticket_rollups (guild_id, period, bucket, opened, closed, duration_total, messages)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (guild_id, period, bucket) DO UPDATE SET
+              opened = opened + excluded.opened,
+              closed = closed + excluded.closed,
+              duration_total = duration_total + excluded.duration_total,
+              messages = messages + excluded.messages
+            """,
+            (guild_id, period, bucket, opened, closed, duration or 0, messages),
+        )
+        if duration is not None:
+            conn.execute(
+                """
+                INSERT INTO ticket_duration_bins (guild_id, period, bucket, bin, count) VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT (guild_id, period, bucket, bin) DO UPDATE SET count = count + 1
+                """,
+                (guild_id, period, bucket, duration_bin(duration)),
+            )
+
+
+def _get_ticket_by_channel(conn: sqlite3.Connection, guild_id: int, channel_id: int):
+    row = conn.execute(
+        """
+        SELECT user_id, category_key, created_at FROM tickets
+        WHERE guild_id=? AND channel_id=?
+        """,
+        (guild_id, channel_id),
+    ).fetchone()
+    if not row:
+        return None
+    return {"user_id": row[0], "category_key": row[1], "created_at": row[2]}
+
+
+def _get_ticket_activity(conn: sqlite3.Connection) -> list[tuple[int, int, int, int]]:
+    return conn.execute(
+        "SELECT guild_id, channel_id, COALESCE(last_activity, opened_at, 0), inactivity_warned FROM tickets"
+    ).fetchall()
+
+
+def _save_ticket_activity(conn: sqlite3.Connection, rows):
+    # Lote vindo do InactivityScheduler: (guild_id, channel_id, last_activity, warned_at).
+    conn.executemany(
+        "UPDATE tickets SET last_activity=?, inactivity_warned=? WHERE guild_id=? AND channel_id=?",
+        ((last, warned_at, guild_id, channel_id) for guild_id, channel_id, last, warned_at in rows),
+    )
+
+
+def _sync_bot_guilds(conn: sqlite3.Connection, shard_id: int, guild_ids: list[int], shard_count: int = 1):
+    # Substitui o conjunto publicado por este shard (on_ready); join/remove depois são incrementais.
+    conn.execute("DELETE FROM bot_guilds WHERE shard_id=?", (shard_id,))
+    conn.executemany(
+        "INSERT OR REPLACE INTO bot_guilds (guild_id, shard_id) VALUES (?, ?)",
+        ((guild_id, shard_id) for guild_id in guild_ids),
+    )
+    # Shards que deixaram de existir (o número de shards diminuiu) não podem deixar o conjunto vencido para sempre.
+    conn.execute("DELETE FROM bot_guilds WHERE shard_id>=?", (shard_count,))
+    conn.execute("DELETE FROM bot_shards WHERE shard_id>=?", (shard_count,))
+    _touch_bot_shard(conn, shard_id, shard_count)
+
+
+def _add_bot_guild(conn: sqlite3.Connection, shard_id: int, guild_id: int):
+    conn.execute("INSERT OR REPLACE INTO bot_guilds (guild_id, shard_id) VALUES (?, ?)", (guild_id, shard_id))
+    conn.execute(
+        "UPDATE bot_shards SET guild_count=(SELECT COUNT(*) FROM bot_guilds WHERE shard_id=?) WHERE shard_id=?",
+        (shard_id, shard_id),
+    )
+
+
+def _remove_bot_guild(conn: sqlite3.Connection, shard_id: int, guild_id: int):
+    conn.execute("DELETE FROM bot_guilds WHERE guild_id=?", (guild_id,))
+    conn.execute(
+        "UPDATE bot_shards SET guild_count=(SELECT COUNT(*) FROM bot_guilds WHERE shard_id=?) WHERE shard_id=?",
+        (shard_id, shard_id),
+    )
+
+
+def _touch_bot_shard(
+    conn: sqlite3.Connection,
+    shard_id: int,
+    shard_count: int = 1,
+    latency_ms: float | None = None,
+    events_per_min: float | None = None,
+):
+    conn.execute(
+        """
+        INSERT INTO bot_shards (shard_id, shard_count, pid, guild_count, heartbeat_at, latency_ms, events_per_min)
+        VALUES (?, ?, ?, (SELECT COUNT(*) FROM bot_guilds WHERE shard_id=?), ?, ?, ?)
+        ON CONFLICT(shard_id) DO UPDATE SET
+          shard_count=excluded.shard_count,
+          pid=excluded.pid,
+          guild_count=excluded.guild_count,
+          heartbeat_at=excluded.heartbeat_at,
+          latency_ms=COALESCE(excluded.latency_ms, latency_ms),
+          events_per_min=COALESCE(excluded.events_per_min, events_per_min)
+        """,
+        (shard_id, shard_count, os.getpid(), shard_id, int(time.time()), latency_ms, events_per_min),
+    )
+
+
+def _get_bot_shards(conn: sqlite3.Connection) -> list[dict]:
+    rows = conn.execute(
+        """
+        SELECT shard_id, shard_count, pid, guild_count, heartbeat_at, latency_ms, events_per_min
+        FROM bot_shards ORDER BY shard_id
+        """
+    ).fetchall()
+    fields = ("shard_id", "shard_count", "pid", "guild_count", "heartbeat_at", "latency_ms", "events_per_min")
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def get_bot_guild_membership(conn: sqlite3.Connection, guild_ids, max_age: int = BOT_GUILDS_MAX_AGE):
+    """Quais de `guild_ids` têm o bot, ou None se o conjunto publicado pelo bot está vencido."""
+    shards, shard_count, oldest = conn.execute(
+        "SELECT COUNT(*), COALESCE(MAX(shard_count), 1), MIN(heartbeat_at) FROM bot_shards"
+    ).fetchone()
+    # Com --processes, um processo que não subiu deixa shards sem linha: os servidores deles não foram publicados.
+    if shards < shard_count or oldest < time.time() - max_age:
+        return None
+    guild_ids = [int(g) for g in guild_ids]
+    found = set()
+    # Uma busca pela chave primária por servidor, em lotes dentro do limite de parâmetros do SQLite.
+    for i in range(0, len(guild_ids), 500):
+        chunk = guild_ids[i : i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        found.update(
+            row[0] for row in conn.execute(f"SELECT guild_id FROM bot_guilds WHERE guild_id IN ({placeholders})", chunk)
+        )
+    return found
+
+
+BULK_CLOSE_MAX = 500
+BULK_CLOSE_FIELDS = (
+    "id", "guild_id", "requested_by", "category_key", "min_age", "owner_left", "max_tickets",
+    "status", "matched", "closed", "failed", "created_at", "updated_at",
+)
+
+
+def request_bulk_close(
+    conn: sqlite3.Connection,
+    guild_id: int,
+    requested_by: int,
+    category_key: str | None,
+    min_age: int,
+    owner_left: bool,
+    max_tickets: int,
+    status: str = "pending",
+) -> int:
+    # O painel grava o pedido como "pending" e o bot o executa (ver watch_bulk_close_requests em bot.py).
+    now = int(time.time())
+    cur = conn.execute(
+        """
+        INSERT INTO bulk_close_requests
+            (guild_id, requested_by, category_key, min_age, owner_left, max_tickets, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (guild_id, requested_by, category_key, min_age, int(owner_left), max_tickets, status, now, now),
+    )
+    return cur.lastrowid
+
+
+def get_bulk_closes(conn: sqlite3.Connection, guild_id: int, limit: int = 5) -> list[dict]:
+    rows = conn.execute(
+        f"SELECT {', '.join(BULK_CLOSE_FIELDS)} FROM bulk_close_requests WHERE guild_id=? ORDER BY id DESC LIMIT ?",
+        (guild_id, limit),
+    ).fetchall()
+    return [dict(zip(BULK_CLOSE_FIELDS, row)) for row in rows]
+
+
+def _get_pending_bulk_closes(conn: sqlite3.Connection, stale_before: int) -> list[dict]:
+    # "running" sem progresso desde stale_before: o processo que o executava caiu; o pedido volta para a fila.
+    rows = conn.execute(
+        f"""
+        SELECT {', '.join(BULK_CLOSE_FIELDS)} FROM bulk_close_requests
+        WHERE status='pending' OR (status='running' AND updated_at < ?) ORDER BY id
+        """,
+        (stale_before,),
+    ).fetchall()
+    return [dict(zip(BULK_CLOSE_FIELDS, row)) for row in rows]
+
+
+def _claim_bulk_close(conn: sqlite3.Connection, request_id: int, stale_before: int) -> bool:
+    cur = conn.execute(
+        """
+        UPDATE bulk_close_requests SET status='running', updated_at=?
+        WHERE id=? AND (status='pending' OR (status='running' AND updated_at < ?))
+        """,
+        (int(time.time()), request_id, stale_before),
+    )
+    return cur.rowcount == 1
+
+
+def _update_bulk_close(conn: sqlite3.Connection, request_id: int, matched: int, closed: int, failed: int, status: str):
+    conn.execute(
+        "UPDATE bulk_close_requests SET matched=?, closed=?, failed=?, status=?, updated_at=? WHERE id=?",
+        (matched, closed, failed, status, int(time.time()), request_id),
+    )
+
+
+def _get_bulk_close_candidates(
+    conn: sqlite3.Connection, guild_id: int, category_key: str | None, opened_before: int, limit: int | None
+) -> list[dict]:
+    rows = conn.execute(
+        """
+        SELECT user_id, category_key, channel_id, created_at FROM tickets
+        WHERE guild_id=? AND (? IS NULL OR category_key=?) AND opened_at <= ?
+        ORDER BY opened_at LIMIT ?
+        """,
+        (guild_id, category_key, category_key, opened_before, -1 if limit is None else limit),
+    ).fetchall()
+    return [{"user_id": r[0], "category_key": r[1], "channel_id": r[2], "created_at": r[3]} for r in rows]
+
+
+def _archive_closed_tickets(conn: sqlite3.Connection, guild_id: int, closed: list[dict]):
+    # Um lote do fechamento em massa numa única transação: transcrições, índice FTS e histórico.
+    for ticket in closed:
+        if ticket.get("archive") is not None:
+            codec, messages, raw_size, fp, size = ticket["archive"]
+            _save_transcript(conn, guild_id, ticket["channel_id"], codec, messages, raw_size, fp, size)
+            _index_transcript(conn, guild_id, ticket["channel_id"], ticket["parts"])
+        _delete_ticket_by_channel(conn, guild_id, ticket["channel_id"], ticket["closed_by"], ticket["message_count"])
+
+
+class Storage:
+    """Acesso assíncrono ao SQLite.
+
+    Escritas passam por uma única thread dona da conexão de escrita, que agrupa
+    as operações pendentes numa só transação (um fsync por lote, com
+    synchronous=FULL, então o await de uma escrita só termina com ela no
+    disco); leituras usam um pool de threads com uma conexão WAL por thread.
+    Nenhuma chamada SQLite roda no event loop.
+    """
+
+    def __init__(self, path: str, *, readers: int = 4, max_batch: int = 256, commit_window: float = 0.0):
+        self.path = path
+        self.max_batch = max_batch
+        self.commit_window = commit_window
+        self.commits = 0
+        self.writes = 0
+        init_conn = connect(path)
+        migrate(init_conn)
+        init_conn.close()
+
+        self._local = threading.local()
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="storage-reader")
+        self._writes: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._writer_loop, name="storage-writer", daemon=True)
+        self._writer.start()
+
+    def _reader_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _run_read(self, fn, args):
+        with STORAGE_QUERY_SECONDS.labels("read", fn.__name__.lstrip("_")).time():
+            return fn(self._reader_conn(), *args)
+
+    def _next_batch(self):
+        # Group commit: junta o que chegou enquanto o commit anterior rodava
+        # (e, se commit_window > 0, espera um pouco mais) até max_batch operações.
+        first = self._writes.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.commit_window
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._writes.get(timeout=timeout) if timeout > 0 else self._writes.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._writes.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    @staticmethod
+    def _rollback(conn: sqlite3.Connection):
+        if conn.in_transaction:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                # Os futures do lote já levam o erro; se a conexão ficou presa, o próximo BEGIN falha o lote seguinte.
+                pass
+
+    def _writer_loop(self):
+        conn = connect(self.path)
+        # FULL: cada COMMIT faz fsync do WAL (em NORMAL, uma queda de energia pode desfazer lotes já confirmados).
+        # Com o group commit é um fsync por lote, não por operação.
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.isolation_level = None
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+
+            done = []
+            batch_started = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+            except BaseException as e:
+                for _, _, fut in batch:
+                    if fut.set_running_or_notify_cancel():
+                        fut.set_exception(e)
+                continue
+            aborted = None
+            for i, (fn, args, fut) in enumerate(batch):
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                started = time.perf_counter()
+                try:
+                    conn.execute("SAVEPOINT op")
+                    result = fn(conn, *args)
+                except BaseException as e:
+                    fut.set_exception(e)
+                    # Erros como SQLITE_FULL ou IOERR desfazem a transação inteira e o savepoint some junto.
+                    try:
+                        if not conn.in_transaction:
+                            raise e
+                        conn.execute("ROLLBACK TO op")
+                        conn.execute("RELEASE op")
+                    except BaseException:
+                        aborted = e
+                        break
+                else:
+                    conn.execute("RELEASE op")
+                    done.append((fut, result))
+                finally:
+                    STORAGE_QUERY_SECONDS.labels("write", fn.__name__.lstrip("_")).observe(time.perf_counter() - started)
+
+            if aborted is not None:
+                # Nada do lote foi gravado: falha quem já tinha rodado e quem ainda não rodou.
+                self._rollback(conn)
+                for fut, _ in done:
+                    fut.set_exception(aborted)
+                for _, _, fut in batch[i + 1:]:
+                    if fut.set_running_or_notify_cancel():
+                        fut.set_exception(aborted)
+                continue
+
+            try:
+                conn.execute("COMMIT")
+            except BaseException as e:
+                self._rollback(conn)
+                for fut, _ in done:
+                    fut.set_exception(e)
+                continue
+
+            self.commits += 1
+            self.writes += len(done)
+            STORAGE_COMMIT_SECONDS.observe(time.perf_counter() - batch_started)
+            STORAGE_BATCH_SIZE.observe(len(batch))
+            # Só resolve depois do COMMIT (com fsync, synchronous=FULL): quem faz await tem a escrita durável.
+            for fut, result in done:
+                fut.set_result(result)
+        conn.close()
+
+    async def read(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._run_read, fn, args)
+
+    async def write(self, fn, *args):
+        fut: Future = Future()
+        self._writes.put((fn, args, fut))
+        return await asyncio.wrap_future(fut)
+
+    def close(self):
+        self._writes.put(None)
+        self._writer.join()
+        self._readers.shutdown(wait=True)
+
+    async def get_guild_config(self, guild_id: int):
+        return await self.read(_get_guild_config, guild_id)
+
+    async def upsert_guild_config(self, guild_id: int, panel_channel_id=None, log_channel_id=None, staff_role_id=None):
+        await self.write(_upsert_guild_config, guild_id, panel_channel_id, log_channel_id, staff_role_id)
+
+    async def set_category(self, guild_id: int, key: str, category_id: int, name: str):
+        await self.write(_set_category, guild_id, key, category_id, name)
+
+    async def get_category_id(self, guild_id: int, key: str):
+        return await self.read(_get_category_id, guild_id, key)
+
+    async def delete_category(self, guild_id: int, key: str):
+        await self.write(_delete_category, guild_id, key)
+
+    async def get_all_guild_configs(self):
+        return await self.read(_get_all_guild_configs)
+
+    async def get_all_categories(self):
+        return await self.read(_get_all_categories)
+
+    async def get_last_config_change(self) -> int:
+        return await self.read(_get_last_config_change)
+
+    async def get_config_changes(self, since_id: int):
+        return await self.read(_get_config_changes, since_id)
+
+    async def get_ticket_categories(self, guild_id: int) -> list[dict]:
+        return await self.read(get_ticket_categories, guild_id)
+
+    async def get_all_ticket_categories(self) -> dict[int, list[dict]]:
+        return await self.read(_get_all_ticket_categories)
+
+    async def upsert_ticket_categories(self, guild_id: int, categories: list[dict], replace: bool = True):
+        await self.write(_upsert_ticket_categories, guild_id, categories, replace)
+
+    async def delete_ticket_category(self, guild_id: int, key: str):
+        await self.write(_delete_ticket_category, guild_id, key)
+
+    async def save_transcript(self, guild_id: int, channel_id: int, codec: str, messages: int, raw_size: int, fp, size: int):
+        await self.write(_save_transcript, guild_id, channel_id, codec, messages, raw_size, fp, size)
+
+    async def index_transcript(self, guild_id: int, channel_id: int, parts):
+        await self.write(_index_transcript, guild_id, channel_id, parts)
+
+    async def has_open_ticket(self, guild_id: int, user_id: int, category_key: str) -> bool:
+        return await self.read(_has_open_ticket, guild_id, user_id, category_key)
+
+    async def save_ticket(self, guild_id: int, user_id: int, category_key: str, channel_id: int):
+        await self.write(_save_ticket, guild_id, user_id, category_key, channel_id)
+
+    async def delete_ticket_by_channel(
+        self, guild_id: int, channel_id: int, closed_by: int | None = None, message_count: int | None = None
+    ):
+        await self.write(_delete_ticket_by_channel, guild_id, channel_id, closed_by, message_count)
+
+    async def get_ticket_activity(self) -> list[tuple[int, int, int, int]]:
+        return await self.read(_get_ticket_activity)
+
+    async def save_ticket_activity(self, rows):
+        await self.write(_save_ticket_activity, rows)
+
+    async def sync_bot_guilds(self, shard_id: int, guild_ids: list[int], shard_count: int = 1):
+        await self.write(_sync_bot_guilds, shard_id, guild_ids, shard_count)
+
+    async def add_bot_guild(self, shard_id: int, guild_id: int):
+        await self.write(_add_bot_guild, shard_id, guild_id)
+
+    async def remove_bot_guild(self, shard_id: int, guild_id: int):
+        await self.write(_remove_bot_guild, shard_id, guild_id)
+
+    async def touch_bot_shard(
+        self, shard_id: int, shard_count: int = 1, latency_ms: float | None = None, events_per_min: float | None = None
+    ):
+        await self.write(_touch_bot_shard, shard_id, shard_count, latency_ms, events_per_min)
+
+    async def get_bot_shards(self) -> list[dict]:
+        return await self.read(_get_bot_shards)
+
+    async def get_ticket_by_channel(self, guild_id: int, channel_id: int):
+        return await self.read(_get_ticket_by_channel, guild_id, channel_id)
+
+    async def request_bulk_close(
+        self,
+        guild_id: int,
+        requested_by: int,
+        category_key: str | None,
+        min_age: int,
+        owner_left: bool,
+        max_tickets: int,
+        status: str = "pending",
+    ) -> int:
+        return await self.write(
+            request_bulk_close, guild_id, requested_by, category_key, min_age, owner_left, max_tickets, status
+        )
+
+    async def get_pending_bulk_closes(self, stale_before: int) -> list[dict]:
+        return await self.read(_get_pending_bulk_closes, stale_before)
+
+    async def claim_bulk_close(self, request_id: int, stale_before: int) -> bool:
+        return await self.write(_claim_bulk_close, request_id, stale_before)
+
+    async def update_bulk_close(self, request_id: int, matched: int, closed: int, failed: int, status: str = "running"):
+        await self.write(_update_bulk_close, request_id, matched, closed, failed, status)
+
+    async def get_bulk_close_candidates(
+        self, guild_id: int, category_key: str | None, opened_before: int, limit: int | None
+    ) -> list[dict]:
+        return await self.read(_get_bulk_close_candidates, guild_id, category_key, opened_before, limit)
+
+    async def archive_closed_tickets(self, guild_id: int, closed: list[dict]):
+        await self.write(_archive_closed_tickets, guild_id, closed)
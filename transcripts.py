@@ -0,0 +1,235 @@
+import tempfile
+import zlib
+from datetime import datetime, timezone
+
+import discord
+
+SPOOL_MAX_MEMORY = 512 * 1024
+MAX_FILES_PER_MESSAGE = 10
+EMPTY_TRANSCRIPT = "(sem mensagens)"
+ARCHIVE_CODEC = "zlib-dict-v1"
+
+
+def format_line(created_at: datetime, author: str, content: str, attachment_urls: list[str], embeds: int) -> str:
+    ts = created_at.replace(tzinfo=timezone.utc).astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    if attachment_urls:
+        att = " | ".join(attachment_urls)
+        content = f"{content}\n[anexos] {att}".strip()
+    if embeds:
+        content = f"{content}\n[embeds] {embeds} embed(s)".strip()
+    return f"[{ts}] {author}: {content}"
+
+
+def format_message(msg: discord.Message) -> str:
+    return format_line(
+        msg.created_at,
+        f"{msg.author} ({msg.author.id})",
+        msg.content or "",
+        [a.url for a in msg.attachments],
+        len(msg.embeds),
+    )
+
+
+class TranscriptFiles:
+    """Escreve a transcrição já codificada em partes de até `part_size` bytes.
+
+    Cada parte é um SpooledTemporaryFile: fica em memória até SPOOL_MAX_MEMORY
+    e depois vai para o disco, então o uso de RAM por fechamento é limitado.
+    """
+
+    def __init__(self, base_name: str, part_size: int):
+        self.base_name = base_name
+        self.part_size = part_size
+        self.parts: list[tempfile.SpooledTemporaryFile] = []
+        self.messages = 0
+        self.bytes = 0
+        self._current = None
+        self._current_size = 0
+
+    def _new_part(self):
+        self._current = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+b")
+        self._current_size = 0
+        self.parts.append(self._current)
+
+    def write_line(self, line: str):
+        data = line.encode("utf-8") + b"\n"
+        if self._current is None or (self._current_size and self._current_size + len(data) > self.part_size):
+            self._new_part()
+        self._current.write(data)
+        self._current_size += len(data)
+        self.bytes += len(data)
+
+    def add(self, msg: discord.Message):
+        self.write_line(format_message(msg))
+        self.messages += 1
+
+    def files(self) -> list[discord.File]:
+        if not self.parts:
+            self.write_line(EMPTY_TRANSCRIPT)
+        files = []
+        for i, part in enumerate(self.parts, start=1):
+            part.seek(0)
+            name = self.base_name if len(self.parts) == 1 else f"{self.base_name}-part{i}"
+            files.append(discord.File(part, filename=f"{name}.txt"))
+        return files
+
+    def close(self):
+        for part in self.parts:
+            part.close()
+
+
+async def stream_transcript(channel: discord.TextChannel, *sinks, limit: int | None = None) -> int:
+    # channel.history pagina de 100 em 100 mensagens; nada além da página atual fica em memória.
+    count = 0
+    async for msg in channel.history(limit=limit, oldest_first=True):
+        for sink in sinks:
+            sink.add(msg)
+        count += 1
+    return count
+
+
+def batch_files(files: list[discord.File], part_size: int) -> list[list[discord.File]]:
+    # Cada mensagem leva no máximo 10 anexos e no máximo `part_size` bytes no total.
+    batches, current, current_size = [], [], 0
+    for f in files:
+        f.fp.seek(0, 2)
+        size = f.fp.tell()
+        f.reset()
+        if current and (len(current) >= MAX_FILES_PER_MESSAGE or current_size + size > part_size):
+            batches.append(current)
+            current, current_size = [], 0
+        current.append(f)
+        current_size += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace("\t", "\\t")
+
+
+def _split_url(url: str) -> tuple[str, str]:
+    # URLs do CDN do Discord: .../attachments/<canal>/<anexo>/<arquivo>; o prefixo
+    # comum do ticket vai até o canal, o resto é único por anexo.
+    base, sep, rest = url.partition("/attachments/")
+    channel, slash, tail = rest.partition("/")
+    if sep and slash:
+        return f"{base}{sep}{channel}", tail
+    prefix, _, name = url.rpartition("/")
+    return prefix, name
+
+
+def _unescape(text: str) -> str:
+    out, i = [], 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append({"n": "\n", "t": "\t", "s": " "}.get(nxt, nxt))
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+class TranscriptArchive:
+    """Codifica a transcrição para o arquivo compactado (codec zlib-dict-v1).
+
+    Registros de texto separados por tab, comprimidos em streaming com zlib:
+      A <idx> <autor>            define um autor
+      P <idx> <prefixo>          define um prefixo de URL de anexo
+      M <epoch> <autor> <texto> <anexos> <embeds>
+    Autores e prefixos de URL (até .../attachments/<canal> no CDN do Discord,
+    senão até a última "/") aparecem uma única vez; as mensagens referenciam o
+    índice, e espaços nos nomes viram "\\s" porque separam as referências.
+    O resultado compactado vai para um SpooledTemporaryFile, então a memória
+    fica limitada mesmo em tickets longos.
+    """
+
+    def __init__(self):
+        self.messages = 0
+        self.size = 0
+        self.fp = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+b")
+        self._zlib = zlib.compressobj(6)
+        self._authors: dict[str, int] = {}
+        self._prefixes: dict[str, int] = {}
+
+    def _emit(self, record: str):
+        data = self._zlib.compress(record.encode("utf-8") + b"\n")
+        if data:
+            self.fp.write(data)
+            self.size += len(data)
+
+    def _ref(self, table: dict[str, int], kind: str, value: str) -> int:
+        idx = table.get(value)
+        if idx is None:
+            idx = table[value] = len(table)
+            self._emit(f"{kind}\t{idx}\t{_escape(value)}")
+        return idx
+
+    def add(self, msg: discord.Message):
+        author = self._ref(self._authors, "A", f"{msg.author} ({msg.author.id})")
+        refs = []
+        for a in msg.attachments:
+            prefix, name = _split_url(a.url)
+            name = _escape(name).replace(" ", "\\s")
+            refs.append(f"{self._ref(self._prefixes, 'P', prefix)}/{name}")
+        epoch = int(msg.created_at.replace(tzinfo=timezone.utc).timestamp())
+        self._emit(f"M\t{epoch}\t{author}\t{_escape(msg.content or '')}\t{' '.join(refs)}\t{len(msg.embeds)}")
+        self.messages += 1
+
+    def finish(self):
+        data = self._zlib.flush()
+        self.fp.write(data)
+        self.size += len(data)
+        self.fp.seek(0)
+        return self.fp
+
+    def close(self):
+        self.fp.close()
+
+
+def iter_archive_text(chunks):
+    """Descomprime um arquivo zlib-dict-v1 (iterável de bytes) e gera o .txt em blocos."""
+    dec = zlib.decompressobj()
+    authors: dict[int, str] = {}
+    prefixes: dict[int, str] = {}
+    pending = b""
+    empty = True
+
+    def render(records: list[bytes]):
+        nonlocal empty
+        out = []
+        for raw in records:
+            kind, *fields = raw.decode("utf-8").split("\t")
+            if kind == "A":
+                authors[int(fields[0])] = _unescape(fields[1])
+            elif kind == "P":
+                prefixes[int(fields[0])] = _unescape(fields[1])
+            elif kind == "M":
+                epoch, author, content, refs, embeds = fields
+                urls = []
+                for ref in refs.split(" ") if refs else ():
+                    idx, _, name = ref.partition("/")
+                    urls.append(f"{prefixes[int(idx)]}/{_unescape(name)}")
+                created_at = datetime.fromtimestamp(int(epoch), timezone.utc)
+                out.append(format_line(created_at, authors[int(author)], _unescape(content), urls, int(embeds)))
+        if out:
+            empty = False
+            return ("\n".join(out) + "\n").encode("utf-8")
+        return b""
+
+    for chunk in chunks:
+        pending += dec.decompress(chunk)
+        *records, pending = pending.split(b"\n")
+        text = render(records)
+        if text:
+            yield text
+    pending += dec.flush()
+    text = render([r for r in pending.split(b"\n") if r])
+    if text:
+        yield text
+    if empty:
+        yield (EMPTY_TRANSCRIPT + "\n").encode("utf-8")